@@ -0,0 +1,115 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+
+# 구멍 합성 함수는 이상감지/Augmentation/synthetic_holes.py와 같은 코드를 이 폴더의 사본에서 사용
+from synthetic_holes import FillTexture, add_holes, default_params, green_mask, valid_centers
+
+
+# 학습 중에 이미지마다 인공 구멍을 합성하는 증강 (결과 이미지를 디스크에 저장하지 않음)
+# 데이터로더 워커 프로세스에서 샘플마다 실행되고, 워커마다 이미지별 초록색 마스크와 중심 후보를 cache_size장까지 저장
+# 합성한 구멍의 박스는 같은 샘플의 라벨(정규화된 xywh)에 class_id로 추가
+# 픽셀 단위 파라미터는 오프라인 CLI처럼 원본 이미지 기준이고, load_image가 imgsz로 줄인 비율(ratio_pad)만큼 줄여서 사용
+class HoleSynthesis:
+    pixel_params = ('border_margin', 'axis_x', 'axis_y', 'jitter', 'min_clearance')
+
+    def __init__(self, fill_path='fill.jpg', probability=0.5, holes=(1, 3), class_id=0, cache_size=1024,
+                 max_centers=4096, params=None):
+        fill_image = cv2.imread(fill_path)
+        if fill_image is None:
+            raise FileNotFoundError(f'Cannot read fill image {fill_path}')
+        self.texture = FillTexture(fill_image)
+        self.probability = probability
+        self.holes = holes  # 이미지당 구멍 개수 범위
+        self.class_id = class_id
+        self.cache_size = cache_size
+        self.max_centers = max_centers
+        self.params = dict(default_params, **(params or {}))
+        self.cache = OrderedDict()  # (이미지 파일, 크기) -> (비트로 압축한 마스크, 중심 후보)
+
+    # 원본 이미지 기준 픽셀 값을 줄인 이미지 크기에 맞춤 (범위 값은 양쪽 끝을 모두 줄임)
+    def scaled_params(self, ratio):
+        params = dict(self.params)
+        if ratio != 1:
+            for name in self.pixel_params:
+                value = params[name]
+                params[name] = tuple(round(v * ratio) for v in value) if isinstance(value, tuple) else round(value * ratio)
+        return params
+
+    # 마스크는 비트 단위로 압축하고 중심 후보는 max_centers개까지만 골라서 워커 메모리를 제한
+    def masks(self, key, image, params):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            packed, centers = self.cache[key]
+            mask = np.unpackbits(packed, count=image.shape[0] * image.shape[1]).reshape(image.shape[:2])
+            return mask, centers
+
+        mask = green_mask(image)
+        centers = valid_centers(mask, params)
+        if len(centers) > self.max_centers:
+            centers = centers[np.random.choice(len(centers), self.max_centers, replace=False)]
+        mask = (mask > 0).astype(np.uint8)
+        self.cache[key] = (np.packbits(mask), centers.astype(np.int16))
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return mask, centers
+
+    # label: ultralytics 데이터셋 샘플 (img: BGR 이미지, bboxes: (N, 4) 정규화된 xywh, cls: (N, 1))
+    def __call__(self, label):
+        if np.random.random() >= self.probability or len(label.get('segments', [])):
+            return label
+
+        image = label['img']
+        # ultralytics가 워커마다 정한 np.random 시드를 따라서 재현 가능하도록 함
+        rng = np.random.default_rng(np.random.randint(0, 2 ** 31))
+        ratio = min(label.get('ratio_pad', (1, 1)))
+        params = self.scaled_params(ratio)
+        mask, centers = self.masks((label['im_file'], image.shape), image, params)
+        params['num_holes'] = int(rng.integers(self.holes[0], self.holes[1] + 1))
+        result, boxes = add_holes(image, self.texture, rng, params, mask, centers)
+        if not boxes:
+            return label
+
+        h, w = image.shape[:2]
+        xyxy = np.array(boxes, dtype=np.float32)
+        xywh = np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2 / w, (xyxy[:, 1] + xyxy[:, 3]) / 2 / h,
+                         (xyxy[:, 2] - xyxy[:, 0]) / w, (xyxy[:, 3] - xyxy[:, 1]) / h], axis=1)
+        label['img'] = result
+        label['bboxes'] = np.concatenate([label['bboxes'].reshape(-1, 4), xywh])
+        label['cls'] = np.concatenate([label['cls'].reshape(-1, 1), np.full((len(boxes), 1), self.class_id, dtype=np.float32)])
+        return label
+
+
+# 학습용 데이터셋: 이미지를 읽은 직후 (모자이크 등 ultralytics 증강 전에) 구멍을 합성
+# 모자이크에 들어가는 다른 이미지도 같은 경로로 읽으므로 모두 증강됨
+class HoleAugmentDataset(YOLODataset):
+    def __init__(self, *args, hole_synthesis=None, **kwargs):
+        self.hole_synthesis = hole_synthesis
+        super().__init__(*args, **kwargs)
+
+    def update_labels_info(self, label):
+        if self.augment and self.hole_synthesis is not None:
+            label = self.hole_synthesis(label)
+        return super().update_labels_info(label)
+
+
+# model.train(..., trainer=hole_trainer(...))로 사용하는 학습기 (검증 데이터는 증강하지 않음)
+def hole_trainer(fill_path='fill.jpg', **options):
+    class HoleAugmentTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            if mode != 'train':
+                return super().build_dataset(img_path, mode, batch)
+            model = getattr(self.model, 'module', self.model)
+            stride = max(int(model.stride.max() if model else 0), 32)
+            return HoleAugmentDataset(img_path=img_path, imgsz=self.args.imgsz, batch_size=batch, augment=True,
+                                      hyp=self.args, rect=self.args.rect, cache=self.args.cache or None,
+                                      single_cls=self.args.single_cls or False, stride=stride, pad=0.0,
+                                      prefix=colorstr('train: '), task=self.args.task, classes=self.args.classes,
+                                      data=self.data, fraction=self.args.fraction,
+                                      hole_synthesis=HoleSynthesis(fill_path, **options))
+
+    return HoleAugmentTrainer
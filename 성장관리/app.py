@@ -1,17 +1,37 @@
-from flask import Flask, jsonify, render_template, Response
+from flask import Flask, jsonify, render_template, Response, request
 import cv2
+import functools
+import hmac
+import logging
 import threading
 import os
 import time
-from ultralytics import YOLO
+
+# 모델 백엔드, 후처리, 실행 속도 조절은 이 폴더의 모듈 사용 (이상감지 모듈의 사본)
+from backends import load_model
+from config import load_config
+from postprocess import extract_detections, draw_detections
+from pacing import PacingController
+from profiles import ModelProfile
 
 app = Flask(__name__)
 
-# YOLO 모델 로드 (best.pt 파일 사용)
-model = YOLO('best.pt')
+logger = logging.getLogger('nufarm')
+
+config = load_config()
+
+# YOLO 모델 로드 (기본값 best.pt, 설정된 백엔드로 변환해서 실행)
+model = load_model(config['weights'], config['backend'], config['imgsz'], config['calibration_dir'])
+
+# growth 모델 실행 프로필 (입력 크기, 감지 기준, 최소 실행 간격, 실행 시간대), /admin/profiles로 실행 중에 변경
+# 성장 단계는 천천히 바뀌므로 설정 파일에서 interval을 길게 잡고 낮 시간대만 실행하도록 할 수 있음
+profile = ModelProfile(**config['profile'], min_imgsz=config['min_imgsz'], max_imgsz=config['imgsz'])
+
+# 추론 시간에 맞춰 실행 간격과 입력 크기를 조절 (목표 FPS와 CPU 예산은 설정 파일에서)
+pacer = PacingController(config['target_fps'], config['cpu_budget'], profile.sizes())
 
 # 웹캠 인덱스
-camera = cv2.VideoCapture(2)
+camera = cv2.VideoCapture(config['camera'])
 
 # 이미지 저장 경로
 img_path = './static/captured_image.jpg'
@@ -19,50 +39,76 @@ img_path = './static/captured_image.jpg'
 # 파일 접근을 보호하기 위한 Lock 생성
 lock = threading.Lock()
 
+# 스트리밍용 최신 JPEG 이미지와 버전 (새 이미지가 생기면 frame_cond로 알림)
+latest_jpeg = None
+frame_version = 0
+frame_cond = threading.Condition()
+
+# 동시에 열 수 있는 MJPEG 스트림 개수 제한
+max_streams = 8
+stream_slots = threading.BoundedSemaphore(max_streams)
+
 # 클래스 이름을 정의 (YOLO 모델에서 사용하는 클래스 이름에 맞게 수정)
 class_names = {
     0: 'level_1',  # 클래스 0의 이름
     1: 'level_2',  # 클래스 1의 이름
 }
 
+# 클래스에 따른 색깔 지정 (그 외 클래스는 초록색)
+class_colors = {
+    0: (0, 0, 255),  # 빨간색 (BGR)
+}
+
 # 주기적으로 웹캠에서 이미지를 캡처하고 YOLO로 처리하는 함수
 def capture_image_periodically():
+    global latest_jpeg, frame_version
+    profile_version = profile.version
     while True:
+        loop_start = time.time()
+
+        # 관리자 API로 프로필이 바뀌었으면 입력 크기 목록을 다시 계산
+        if profile.version != profile_version:
+            profile_version = profile.version
+            pacer.set_sizes(profile.sizes())
+
+        # 실행 시간대가 아니면 캡처도 하지 않고 1분 뒤에 다시 확인
+        if not profile.active(loop_start):
+            time.sleep(60)
+            continue
+
         # 버퍼를 제거하기 위해 grab()을 먼저 호출
         camera.grab()
 
         # 최신 프레임을 가져오기 위해 retrieve() 호출
         ret, frame = camera.retrieve()
         if ret:
-            # YOLO 모델로 객체 감지
-            results = model(frame)
-
-            # 객체 감지된 결과를 이미지에 표시
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)  # 바운딩 박스 좌표
-                    label_id = int(box.cls)  # 클래스 레이블 (int로 변환)
-                    
-                    # 클래스에 따른 색깔 지정
-                    if label_id == 0:
-                        color = (0, 0, 255)  # 빨간색 (BGR)
-                    else:
-                        color = (0, 255, 0)  # 초록색 (BGR)
-            
-                    # 클래스 이름을 가져옴 (클래스 레이블에 해당하는 이름)
-                    label = class_names.get(label_id, 'Unknown')
-
-                    # 바운딩 박스와 클래스 이름 표시
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f'{label}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-            with lock:
-                # 감지된 이미지를 저장
-                cv2.imwrite(img_path, frame)
-
-        time.sleep(0.1)  # n초마다 이미지 캡처
+            # YOLO 모델로 객체 감지 (추론 시간을 측정해서 다음 대기 시간 계산)
+            inference_start = time.perf_counter()
+            results = model(frame, imgsz=pacer.imgsz, **profile.predict_args())
+            pacer.record(time.perf_counter() - inference_start)
+
+            # 객체 감지된 결과를 이미지에 표시 (박스 정보는 프레임당 한 번에 NumPy로 가져옴)
+            detections = extract_detections(results)
+            draw_detections(frame, detections, class_names, class_colors, default_color=(0, 255, 0))
+
+            ok, buf = cv2.imencode('.jpg', frame)
+            if ok:
+                with lock:
+                    # 감지된 이미지를 저장
+                    try:
+                        with open(img_path, 'wb') as f:
+                            f.write(buf.tobytes())
+                    except OSError as e:
+                        print(f'Error saving image: {e}')
+
+                with frame_cond:
+                    latest_jpeg = buf.tobytes()
+                    frame_version += 1
+                    frame_cond.notify_all()
+
+        # 이번 실행에 걸린 시간을 뺀 만큼만 대기 (프로필의 최소 실행 간격보다 짧아지지 않도록)
+        interval = max(pacer.interval(), profile.interval or 0)
+        time.sleep(max(0.0, interval - (time.time() - loop_start)))
 
 # 별도의 스레드로 주기적으로 이미지 캡처 실행
 thread = threading.Thread(target=capture_image_periodically)
@@ -84,5 +130,70 @@ def get_image():
         else:
             return jsonify({'status': 'error', 'message': 'No image available.'})
 
+# 새 이미지가 생길 때만 프레임을 전송하는 MJPEG 스트림
+# 클라이언트가 느리면 밀린 프레임은 건너뛰고 항상 최신 프레임만 보냄
+def mjpeg_stream(keepalive=10):
+    last_version = 0
+    data = None
+    while True:
+        with frame_cond:
+            frame_cond.wait_for(lambda: frame_version > last_version, keepalive)
+            if frame_version > last_version:
+                last_version = frame_version
+                data = latest_jpeg
+
+        # 새 이미지가 없으면 마지막 이미지를 다시 보내서 연결 끊김을 확인
+        if data is None:
+            continue
+
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n'
+               b'Content-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n')
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({'status': 'error', 'message': 'Too many streams.'}), 503
+
+    response = Response(mjpeg_stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.call_on_close(stream_slots.release)
+    return response
+
+# 설정 파일에 admin_token이 있으면 X-Admin-Token 헤더가 같은 요청만 허용
+# admin_token이 없으면 서버가 실행 중인 기기(localhost)에서 온 요청만 허용 (서버는 0.0.0.0에서 실행됨)
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if config['admin_token'] is None:
+            if request.remote_addr not in ('127.0.0.1', '::1'):
+                return jsonify({'status': 'error', 'message': 'Admin API is only available from localhost without admin_token.'}), 403
+        elif not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), config['admin_token']):
+            return jsonify({'status': 'error', 'message': 'Invalid admin token.'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# growth 모델 실행 프로필 조회 (이상감지 서버와 같은 형식)
+@app.route('/admin/profiles', methods=['GET'])
+@admin_only
+def get_profiles():
+    return jsonify({'growth': profile.to_dict()})
+
+# growth 모델 실행 프로필 변경 (바꿀 항목만 JSON으로 전송, 예: {"interval": 600, "windows": [["06:00", "19:00"]]})
+# 다음 실행부터 적용되고 서버를 다시 시작하면 설정 파일 값으로 돌아감
+@app.route('/admin/profiles/<name>', methods=['PUT', 'POST'])
+@admin_only
+def update_profile(name):
+    if name != 'growth':
+        return jsonify({'status': 'error', 'message': f'Unknown model {name}.'}), 404
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON object.'}), 400
+    try:
+        profile.update(changes)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    logger.info('profile updated', extra={'fields': {'model': name, **changes}})
+    return jsonify(profile.to_dict())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
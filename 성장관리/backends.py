@@ -0,0 +1,72 @@
+import hashlib
+import logging
+import os
+import shutil
+
+from ultralytics import YOLO
+
+logger = logging.getLogger('nufarm')
+
+
+# 이상감지/backends.py의 사본 (성장관리는 이상감지 폴더 없이 따로 실행, onnx-int8은 이 폴더의 quantize.py 사용)
+# 사용할 수 있는 추론 백엔드 (pytorch 외에는 ultralytics export 형식 이름)
+# onnx-int8은 캡처 이미지로 보정한 INT8 양자화 ONNX 모델 (quantize.py)
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'onnx-int8')
+
+# export한 모델을 저장하는 폴더 (가중치 파일 해시별로 한 번만 export)
+cache_dir = './model_cache'
+
+
+def weight_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def exported_path(weights, backend, imgsz):
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    target_dir = os.path.join(cache_dir, f'{stem}-{weight_hash(weights)}-{imgsz}')
+    if backend == 'openvino':
+        return target_dir, os.path.join(target_dir, f'{stem}_openvino_model')
+    return target_dir, os.path.join(target_dir, f'{stem}.{backend}')
+
+
+# 가중치를 ONNX / OpenVINO로 변환 (이미 변환된 모델이 있으면 그대로 사용)
+def export_model(weights, backend, imgsz=640):
+    target_dir, target = exported_path(weights, backend, imgsz)
+    if os.path.exists(target):
+        return target
+
+    # export 결과는 가중치 파일 옆에 생기므로 캐시 폴더에 복사한 뒤 변환
+    os.makedirs(target_dir, exist_ok=True)
+    src = os.path.join(target_dir, os.path.basename(weights))
+    shutil.copyfile(weights, src)
+    try:
+        # 여러 프레임을 한 번에 추론할 수 있도록 배치 크기는 고정하지 않음
+        YOLO(src).export(format=backend, imgsz=imgsz, dynamic=True)
+    finally:
+        os.remove(src)
+    return target
+
+
+# 설정된 백엔드로 모델을 불러옴 (실패하면 PyTorch 모델 사용)
+# 어떤 백엔드든 결과는 YOLO Results (boxes.xyxy / cls / conf) 형태로 동일
+def load_model(weights, backend='pytorch', imgsz=640, calibration_dir='./calibration'):
+    if backend not in BACKENDS:
+        logger.warning('Unknown backend, using pytorch', extra={'fields': {'weights': weights, 'backend': backend}})
+    elif backend != 'pytorch':
+        try:
+            if backend == 'onnx-int8':
+                from quantize import quantize_model
+                path = quantize_model(weights, calibration_dir, imgsz)
+            else:
+                path = export_model(weights, backend, imgsz)
+            model = YOLO(path, task='detect')
+            logger.info('Model loaded', extra={'fields': {'weights': weights, 'backend': backend}})
+            return model
+        except Exception as e:
+            logger.error('Loading backend failed, using pytorch',
+                         extra={'fields': {'weights': weights, 'backend': backend, 'error': str(e)}})
+    return YOLO(weights)
@@ -0,0 +1,44 @@
+import copy
+import json
+import os
+
+
+# 성장관리 기본 설정 (config.json이 있으면 같은 키의 값을 덮어씀, 이상감지와 설정 파일을 따로 사용)
+DEFAULT_CONFIG = {
+    # 모델 가중치 파일과 추론 백엔드 (pytorch / onnx / openvino / onnx-int8)
+    'weights': 'best.pt',
+    'backend': 'onnx',
+    # 웹캠 인덱스
+    'camera': 2,
+    # target_fps: 목표 실행 횟수 (초당), cpu_budget: 추론에 쓸 수 있는 시간 비율 (넘으면 속도와 입력 크기를 낮춤)
+    'target_fps': 10,
+    'cpu_budget': 0.25,
+    # 입력 크기 (imgsz 이하), 감지 기준 (conf, iou), 최소 실행 간격 (interval초, null이면 target_fps만 따름),
+    # 실행 시간대 (windows [["HH:MM", "HH:MM"], ...], 비어 있으면 항상)
+    'profile': {'imgsz': 640, 'conf': 0.25, 'iou': 0.7, 'interval': None, 'windows': []},
+    # 최대 모델 입력 크기 (모델 변환 기준), 추론이 느리면 min_imgsz까지 낮춤
+    'imgsz': 640,
+    'min_imgsz': 320,
+    # onnx-int8 백엔드의 보정에 사용할 웹캠 캡처 이미지 폴더
+    'calibration_dir': './calibration',
+    # /admin 요청에 필요한 X-Admin-Token 헤더 값 (null이면 localhost에서 온 요청만 허용)
+    'admin_token': None,
+}
+
+
+def merge(base, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path=None):
+    path = path or os.environ.get('NUFARM_GROWTH_CONFIG', 'config.json')
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            merge(config, json.load(f))
+    return config
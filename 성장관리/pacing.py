@@ -0,0 +1,86 @@
+import logging
+
+logger = logging.getLogger('nufarm')
+
+
+# 이상감지/pacing.py의 사본 (성장관리는 이상감지 폴더 없이 따로 실행)
+# 파이프라인별 실행 간격과 입력 크기를 측정된 추론 시간에 맞춰 조절하는 클래스
+# target_fps: 목표 실행 횟수 (초당), cpu_budget: 추론에 쓸 수 있는 시간 비율 (0~1)
+class PacingController:
+    def __init__(self, target_fps=10.0, cpu_budget=0.5, sizes=(640,), smoothing=0.3, recover_after=5):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.sizes = sorted(sizes, reverse=True)  # 큰 입력 크기부터 차례로 낮춤
+        self.size_index = 0
+        self.smoothing = smoothing
+        self.recover_after = recover_after  # 여유가 이만큼 연속으로 있으면 입력 크기를 다시 올림
+        self.latency = None  # 추론 시간 이동 평균 (초)
+        self.headroom_rounds = 0
+        self.warmup = 1  # 첫 추론은 모델 초기화 시간이 포함되므로 측정에서 제외
+
+    @property
+    def imgsz(self):
+        return self.sizes[self.size_index]
+
+    # 목표 FPS 주기 동안 추론에 쓸 수 있는 시간
+    def budget(self):
+        return self.cpu_budget / self.target_fps
+
+    def record(self, latency):
+        if self.warmup > 0:
+            self.warmup -= 1
+            return
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        # 예산을 넘으면 입력 크기를 낮추고, 여유가 계속되면 다시 올림
+        if self.latency > self.budget() and self.size_index < len(self.sizes) - 1:
+            self._resize(self.size_index + 1)
+        elif self.latency < self.budget() * 0.5 and self.size_index > 0:
+            self.headroom_rounds += 1
+            if self.headroom_rounds >= self.recover_after:
+                self._resize(self.size_index - 1)
+        else:
+            self.headroom_rounds = 0
+
+    def _resize(self, index):
+        logger.info('Input size changed', extra={'fields': {'from': self.imgsz, 'to': self.sizes[index],
+                                                            'latency_ms': round(self.latency * 1000)}})
+        self.size_index = index
+        self.latency = None  # 입력 크기가 바뀌면 새로 측정
+        self.headroom_rounds = 0
+
+    # 모델 프로필의 입력 크기가 바뀌면 새 크기 목록의 가장 큰 크기부터 다시 측정
+    def set_sizes(self, sizes):
+        self.sizes = sorted(sizes, reverse=True)
+        self.size_index = 0
+        self.latency = None
+        self.headroom_rounds = 0
+
+    # 다음 실행까지의 간격: 목표 FPS 주기와 CPU 예산을 지키는 주기 중 긴 쪽
+    def interval(self):
+        interval = 1.0 / self.target_fps
+        if self.latency is not None:
+            interval = max(interval, self.latency / self.cpu_budget)
+        return interval
+
+    def stats(self):
+        return {
+            'target_fps': self.target_fps,
+            'fps': 1.0 / self.interval(),
+            'imgsz': self.imgsz,
+            'latency_ms': None if self.latency is None else self.latency * 1000,
+        }
+
+
+# 기본 입력 크기부터 min_size까지 32의 배수로 줄여가는 입력 크기 목록
+def size_steps(imgsz, min_size=320, step=0.8):
+    sizes = [imgsz]
+    while True:
+        size = int(sizes[-1] * step) // 32 * 32
+        if size < min_size or size == sizes[-1]:
+            return sizes
+        sizes.append(size)
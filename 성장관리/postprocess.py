@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+# 이상감지/postprocess.py의 사본 (성장관리는 이상감지 폴더 없이 따로 실행)
+# 한 프레임의 감지 결과 (xyxy: (N, 4) int, cls: (N,) int, conf: (N,) float)
+Detections = namedtuple('Detections', ['xyxy', 'cls', 'conf'])
+
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), dtype=int), np.zeros(0, dtype=int), np.zeros(0, dtype=np.float32))
+
+
+# YOLO 결과의 박스 좌표, 클래스, 신뢰도를 프레임당 한 번씩만 NumPy로 가져옴
+def extract_detections(results):
+    xyxy, cls, conf = [], [], []
+    for result in results:
+        boxes = result.boxes
+        xyxy.append(boxes.xyxy.cpu().numpy())
+        cls.append(boxes.cls.cpu().numpy())
+        conf.append(boxes.conf.cpu().numpy())
+
+    if not xyxy:
+        return empty_detections()
+    return Detections(np.concatenate(xyxy).astype(int).reshape(-1, 4),
+                      np.concatenate(cls).astype(int),
+                      np.concatenate(conf).astype(np.float32))
+
+
+def draw_detections(frame, detections, class_names, class_colors, default_color=(255, 255, 255)):
+    for (x1, y1, x2, y2), label_id in zip(detections.xyxy.tolist(), detections.cls.tolist()):
+        color = class_colors.get(label_id, default_color)
+        label = class_names.get(label_id, 'Unknown')
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f'{label}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+    return frame
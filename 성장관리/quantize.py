@@ -0,0 +1,95 @@
+import glob
+import hashlib
+import os
+import re
+
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+from backends import export_model
+
+# 이상감지/quantize.py의 INT8 변환 부분 사본 (성장관리는 이상감지 폴더 없이 따로 실행)
+# FP32/INT8 비교 리포트는 이상감지/quantize.py로 만들고, 변환된 모델은 같은 model_cache 경로 규칙을 사용
+
+
+# 이상감지/scheduler.py와 같은 letterbox 전처리 (보정 이미지를 추론할 때와 같은 방식으로 변환)
+def letterbox(frame, size):
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_w, pad_h = size - new_w, size - new_h
+    left, top = pad_w // 2, pad_h // 2
+    padded = cv2.copyMakeBorder(frame, top, pad_h - top, left, pad_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, ratio, (left, top)
+
+
+image_patterns = ('*.jpg', '*.jpeg', '*.png')
+
+
+def list_images(folder, limit=None):
+    paths = sorted(p for pattern in image_patterns for p in glob.glob(os.path.join(folder, pattern)))
+    return paths[:limit] if limit else paths
+
+
+# 직접 캡처한 웹캠 이미지 폴더로 INT8 보정(calibration) 데이터를 만드는 reader
+class FrameCalibrationReader(CalibrationDataReader):
+    def __init__(self, paths, input_name, imgsz):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            image, _, _ = letterbox(frame, self.imgsz)
+            x = image[..., ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(x)}
+        return None
+
+
+# 마지막 Detect 헤드는 양자화하면 박스 좌표 정확도가 크게 떨어지므로 FP32로 유지
+def detect_head_nodes(model):
+    indices = [int(m.group(1)) for node in model.graph.node for m in [re.match(r'/model\.(\d+)/', node.name)] if m]
+    if not indices:
+        return []
+    prefix = f'/model.{max(indices)}/'
+    return [node.name for node in model.graph.node if node.name.startswith(prefix)]
+
+
+# ONNX 모델을 INT8로 정적 양자화 (보정 이미지 목록별로 한 번만 수행)
+def quantize_model(weights, calibration_dir, imgsz=640, limit=200):
+    paths = list_images(calibration_dir, limit)
+    if not paths:
+        raise FileNotFoundError(f'No calibration images in {calibration_dir}')
+
+    fp32_path = export_model(weights, 'onnx', imgsz)
+    calib_hash = hashlib.sha256('\n'.join(paths).encode()).hexdigest()[:8]
+    target = fp32_path[:-len('.onnx')] + f'.int8-{calib_hash}.onnx'
+    if os.path.exists(target):
+        return target
+
+    fp32_model = onnx.load(fp32_path)
+    reader = FrameCalibrationReader(paths, fp32_model.graph.input[0].name, imgsz)
+    tmp_path = target + '.tmp'
+    quantize_static(fp32_path, tmp_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    nodes_to_exclude=detect_head_nodes(fp32_model))
+
+    # 클래스 이름, stride 등 ultralytics가 읽는 메타데이터를 FP32 모델에서 복사
+    int8_model = onnx.load(tmp_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, tmp_path)
+    os.replace(tmp_path, target)
+    return target
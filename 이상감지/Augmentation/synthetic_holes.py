@@ -0,0 +1,226 @@
+import argparse
+import functools
+import glob
+import multiprocessing
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+# Image_processing_several.ipynb의 인공 구멍 합성을 모듈/CLI로 옮긴 것
+# 잎(초록색 영역) 위에 불규칙한 타원형 다각형 구멍을 fill.jpg 질감으로 채우고 YOLO 라벨(hole)을 같이 저장
+# 학습 중 증강(모델학습/hole_augment.py)은 합성 함수의 사본(모델학습/synthetic_holes.py)을 사용하므로 같이 수정
+# (이상감지/check_copies.py로 두 파일의 함수가 같은지 확인)
+
+# 초록색 범위 (HSV)
+lower_green = np.array([20, 40, 40])
+upper_green = np.array([90, 255, 255])
+
+default_params = {
+    'num_holes': 3,  # 이미지당 구멍 개수
+    'border_margin': 10,  # 구멍 중심이 가장자리에서 떨어져야 할 최소 거리
+    'vertices': (10, 20),  # 다각형 꼭짓점 개수 범위
+    'axis_x': (20, 30),  # 타원의 가로축 반지름 범위
+    'axis_y': (10, 40),  # 타원의 세로축 반지름 범위
+    'jitter': (-10, 20),  # 꼭짓점마다 반지름에 더하는 변동 범위
+    'min_clearance': 10,  # 중심에서 초록색 영역 경계까지의 최소 거리 (침식한 마스크의 거리 변환 기준)
+    'center_scale': 2,  # 중심 후보는 이 배율로 줄인 마스크에서 계산 (꼭짓점 검사는 원본 크기 마스크로)
+    'candidates': 64,  # 한 번에 만들어서 검사하는 다각형 수
+    'max_rounds': 20,  # 구멍 하나를 놓지 못하면 포기하기 전까지 반복할 횟수
+}
+
+
+def green_mask(image):
+    return cv2.inRange(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), lower_green, upper_green)
+
+
+# 구멍 중심이 될 수 있는 픽셀을 이미지당 한 번만 계산
+# 잡음 픽셀을 침식으로 지운 뒤, 경계에서 min_clearance 이상 안쪽이면서 가장자리 여백 안에 있는 픽셀만 후보로 사용
+# 반환값: 줄인 마스크 기준 후보 좌표에 center_scale을 곱한 원본 좌표 (N, 2), 사용할 때 0~center_scale 사이 값을 더함
+def valid_centers(mask, params):
+    scale = params['center_scale']
+    if scale > 1:
+        mask = cv2.resize(mask, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_NEAREST)
+    eroded = cv2.erode(mask, np.ones((3, 3), np.uint8))
+    distance = cv2.distanceTransform(eroded, cv2.DIST_L2, 3)
+    margin = -(-params['border_margin'] // scale)
+    distance[:margin + 1] = 0
+    distance[-margin - 1:] = 0
+    distance[:, :margin + 1] = 0
+    distance[:, -margin - 1:] = 0
+    points = cv2.findNonZero((distance >= params['min_clearance'] / scale).view(np.uint8))
+    if points is None:
+        return np.zeros((0, 2), np.int32)
+    return points.reshape(-1, 2) * scale
+
+
+# 후보 중심마다 다각형을 한 번에 만듦 (꼭짓점 수가 달라서 최대 개수로 만들고 나머지는 사용하지 않음)
+# 반환값: 꼭짓점 좌표 (K, V, 2), 사용하는 꼭짓점 표시 (K, V)
+def random_polygons(rng, centers, params):
+    count = len(centers)
+    max_vertices = params['vertices'][1]
+    num_vertices = rng.integers(params['vertices'][0], max_vertices + 1, count)
+    axis_x = rng.integers(params['axis_x'][0], params['axis_x'][1] + 1, count)
+    axis_y = rng.integers(params['axis_y'][0], params['axis_y'][1] + 1, count)
+    angle_offset = rng.uniform(0, 2 * np.pi, count)
+
+    index = np.arange(max_vertices)
+    angle = 2 * np.pi * index[None] / num_vertices[:, None] + angle_offset[:, None]
+    r_x = axis_x[:, None] + rng.integers(params['jitter'][0], params['jitter'][1] + 1, (count, max_vertices))
+    r_y = axis_y[:, None] + rng.integers(params['jitter'][0], params['jitter'][1] + 1, (count, max_vertices))
+    x = (centers[:, 0, None] + r_x * np.cos(angle)).astype(np.int32)
+    y = (centers[:, 1, None] + r_y * np.sin(angle)).astype(np.int32)
+    return np.stack([x, y], axis=-1), index[None] < num_vertices[:, None]
+
+
+# 모든 꼭짓점이 이미지 안, 초록색 영역 안에 있는 다각형인지 한 번에 검사
+def valid_polygons(points, used, mask):
+    h, w = mask.shape
+    x, y = points[..., 0], points[..., 1]
+    inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+    green = mask[y.clip(0, h - 1), x.clip(0, w - 1)] > 0
+    return np.all((inside & green) | ~used, axis=1)
+
+
+# 구멍을 채울 질감 이미지 (다각형 크기별로 리사이즈한 결과를 재사용)
+class FillTexture:
+    def __init__(self, image, cache_size=4096):
+        self.image = image
+        self.resized = functools.lru_cache(maxsize=cache_size)(self._resize)
+
+    def _resize(self, w, h):
+        return cv2.resize(self.image, (w, h))
+
+
+# 다각형의 바운딩 박스 안에서만 마스크를 만들어서 질감을 복사
+def fill_polygon(result, polygon, texture):
+    x_min, y_min = polygon.min(axis=0)
+    x_max, y_max = polygon.max(axis=0)
+    w, h = int(x_max - x_min), int(y_max - y_min)
+    if w <= 0 or h <= 0:
+        return None
+
+    local_mask = np.zeros((h, w), np.uint8)
+    cv2.fillPoly(local_mask, [polygon - (x_min, y_min)], 255)
+    region = result[y_min:y_max, x_min:x_max]
+    np.copyto(region, texture.resized(w, h), where=local_mask[..., None] > 0)
+    return x_min, y_min, x_max, y_max
+
+
+# 이미지 한 장에 구멍을 합성하고 (결과 이미지, 구멍 박스 목록)을 반환
+# 같은 이미지로 여러 장을 만들 때는 mask, centers를 한 번만 계산해서 넘김
+def add_holes(image, texture, rng, params=default_params, mask=None, centers=None):
+    if mask is None:
+        mask = green_mask(image)
+    if centers is None:
+        centers = valid_centers(mask, params)
+    result = image.copy()
+    boxes = []
+    if len(centers) == 0:
+        return result, boxes
+
+    for _ in range(params['max_rounds']):
+        picked = centers[rng.integers(0, len(centers), params['candidates'])]
+        picked = picked + rng.integers(0, params['center_scale'], picked.shape)
+        points, used = random_polygons(rng, picked, params)
+        for k in np.flatnonzero(valid_polygons(points, used, mask)):
+            box = fill_polygon(result, points[k][used[k]], texture)
+            if box is not None:
+                boxes.append(box)
+            if len(boxes) == params['num_holes']:
+                return result, boxes
+    return result, boxes
+
+
+# 픽셀 좌표 박스를 YOLO 형식 (class cx cy w h, 0~1) 라벨 줄로 변환
+def yolo_lines(boxes, shape, class_id=0):
+    h, w = shape[:2]
+    return [f'{class_id} {(x1 + x2) / 2 / w:.6f} {(y1 + y2) / 2 / h:.6f} {(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f}'
+            for x1, y1, x2, y2 in boxes]
+
+
+# 워커 프로세스마다 질감 이미지와 설정을 한 번만 준비
+worker_state = {}
+
+
+def init_worker(fill_path, output_dir, labels_dir, params, seed, class_id):
+    fill_image = cv2.imread(fill_path)
+    if fill_image is None:
+        raise FileNotFoundError(f'Cannot read fill image {fill_path}')
+    worker_state.update(texture=FillTexture(fill_image), output_dir=output_dir, labels_dir=labels_dir,
+                        params=params, seed=seed, class_id=class_id)
+
+
+# 작업 하나 = (이미지 번호, 이미지 경로, 만들 결과 이미지 수), 이미지 읽기와 중심 후보 계산은 한 번만 함
+# 난수는 (seed, 이미지 번호, 복사본 번호)로 정하므로 워커 수나 처리 순서와 관계없이 결과가 같음
+def process_image(task):
+    index, path, copies = task
+    state = worker_state
+    image = cv2.imread(path)
+    if image is None:
+        print(f'Cannot read {path}')
+        return 0
+
+    # 원래 라벨이 있으면 유지하고 합성한 구멍 라벨을 뒤에 추가
+    stem = os.path.splitext(os.path.basename(path))[0]
+    labels = []
+    if state['labels_dir'] is not None:
+        label_path = os.path.join(state['labels_dir'], f'{stem}.txt')
+        if os.path.exists(label_path):
+            with open(label_path, 'r', encoding='utf-8') as f:
+                labels = [line.strip() for line in f if line.strip()]
+
+    mask = green_mask(image)
+    centers = valid_centers(mask, state['params'])
+    holes = 0
+    for copy in range(copies):
+        rng = np.random.default_rng([state['seed'], index, copy])
+        result, boxes = add_holes(image, state['texture'], rng, state['params'], mask, centers)
+        holes += len(boxes)
+
+        name = f'{stem}_{copy}' if copy else stem
+        cv2.imwrite(os.path.join(state['output_dir'], 'images', f'{name}.jpg'), result)
+        lines = labels + yolo_lines(boxes, image.shape, state['class_id'])
+        with open(os.path.join(state['output_dir'], 'labels', f'{name}.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + ('\n' if lines else ''))
+    return holes
+
+
+def run(image_paths, output_dir, fill_path, copies=1, workers=None, seed=0, labels_dir=None, class_id=0,
+        params=default_params):
+    os.makedirs(os.path.join(output_dir, 'images'), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, 'labels'), exist_ok=True)
+    tasks = [(index, path, copies) for index, path in enumerate(image_paths)]
+
+    start = time.time()
+    holes = 0
+    with multiprocessing.Pool(workers, initializer=init_worker,
+                              initargs=(fill_path, output_dir, labels_dir, params, seed, class_id)) as pool:
+        for done, placed in enumerate(pool.imap_unordered(process_image, tasks, chunksize=4), 1):
+            holes += placed
+            if done % 1000 == 0:
+                print(f'{done}/{len(tasks)} source images ({time.time() - start:.0f} s)')
+    print(f'Saved {len(tasks) * copies} images with {holes} holes to {output_dir} ({time.time() - start:.0f} s)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='잎 이미지에 인공 구멍을 합성하고 YOLO 라벨을 생성')
+    parser.add_argument('input', help='이미지 폴더 또는 glob 패턴 (예: "C:/hole/several/*.jpg")')
+    parser.add_argument('output', help='결과 폴더 (images/, labels/ 아래에 저장)')
+    parser.add_argument('--fill', default='fill.jpg', help='구멍을 채울 이미지')
+    parser.add_argument('--labels', default=None, help='원본 이미지의 YOLO 라벨 폴더 (있으면 원래 라벨을 유지)')
+    parser.add_argument('--copies', type=int, default=1, help='원본 이미지마다 만들 결과 이미지 수')
+    parser.add_argument('--holes', type=int, default=default_params['num_holes'], help='이미지당 구멍 개수')
+    parser.add_argument('--class-id', type=int, default=0, help='구멍 라벨의 클래스 번호 (abnormal 모델의 hole)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='워커 프로세스 수 (기본값: CPU 코어 수)')
+    args = parser.parse_args()
+
+    pattern = os.path.join(args.input, '*.jpg') if os.path.isdir(args.input) else args.input
+    image_paths = sorted(glob.glob(pattern))
+    if not image_paths:
+        raise SystemExit(f'No images in {args.input}')
+    run(image_paths, args.output, args.fill, args.copies, args.workers, args.seed, args.labels, args.class_id,
+        dict(default_params, num_holes=args.holes))
@@ -0,0 +1,303 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+
+import cv2
+
+from backends import load_model
+from config import load_config
+from postprocess import count_classes
+from scheduler import preprocess, restore_boxes
+
+
+image_extensions = ('.jpg', '.jpeg', '.png', '.bmp')
+video_extensions = ('.mp4', '.avi', '.mov', '.mkv')
+
+class_names = {
+    'abnormal': {0: 'hole', 1: 'wither'},
+    'growth': {0: 'level_1', 1: 'level_2', 2: 'level_3'},
+}
+
+detection_columns = ['source', 'frame', 'model', 'class_id', 'class_name', 'conf', 'x1', 'y1', 'x2', 'y2']
+count_columns = ['source', 'frame', 'model', 'class_name', 'count']
+
+
+# 입력 경로 (폴더 / glob 패턴 / 동영상 / 이미지 파일)를 작업 단위로 나눔
+# 이미지는 chunk장씩, 동영상은 stride 간격으로 뽑은 chunk장 분량의 프레임 구간을 하나의 작업으로 만듦
+# 순서가 항상 같아야 이어서 실행할 수 있으므로 폴더와 glob 결과는 정렬해서 사용 (폴더는 하위 폴더 순서대로 조금씩 읽음)
+def iter_files(inputs):
+    for source in inputs:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.exists(source):
+            yield source
+        else:
+            yield from sorted(glob.glob(source, recursive=True))
+
+
+def iter_tasks(inputs, chunk=16, stride=1):
+    images = []
+    for path in iter_files(inputs):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in image_extensions:
+            images.append(path)
+            if len(images) == chunk:
+                yield ('images', images)
+                images = []
+        elif ext in video_extensions:
+            video = cv2.VideoCapture(path)
+            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+            for start in range(0, frame_count, chunk * stride):
+                yield ('video', (path, start, min(frame_count, start + chunk * stride), stride))
+    if images:
+        yield ('images', images)
+
+
+# 작업에 해당하는 프레임을 읽음 (이미지 경로 또는 동영상 경로, 프레임 번호)
+def read_frames(kind, payload):
+    if kind == 'images':
+        for path in payload:
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f'Cannot read {path}')
+                continue
+            yield path, 0, frame
+        return
+
+    path, start, end, stride = payload
+    video = cv2.VideoCapture(path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, start)
+    for index in range(start, end):
+        # 뽑지 않는 프레임은 디코딩 결과를 가져오지 않음
+        if (index - start) % stride:
+            if not video.grab():
+                break
+            continue
+        ok, frame = video.read()
+        if not ok:
+            break
+        yield path, index, frame
+    video.release()
+
+
+# 워커 프로세스마다 한 번만 모델을 로드
+worker_models = {}
+worker_imgsz = [640]
+
+
+def init_worker(model_specs, imgsz, calibration_dir, threads):
+    import torch
+
+    # 워커끼리 CPU 코어를 나눠 쓰도록 프로세스당 스레드 수 제한
+    torch.set_num_threads(threads)
+    worker_imgsz[0] = imgsz
+    for name, (weights, backend, predict_args) in model_specs.items():
+        worker_models[name] = (load_model(weights, backend, imgsz, calibration_dir), predict_args)
+
+
+# 워커에서 프레임을 읽고 두 모델을 실행한 뒤 박스 정보(N x 6)만 돌려줌 (이미지는 부모 프로세스로 보내지 않음)
+def run_task(task):
+    kind, payload = task
+    imgsz = worker_imgsz[0]
+    frames = []
+    for source, index, frame in read_frames(kind, payload):
+        tensor, metas = preprocess([frame], imgsz)
+        boxes = {}
+        for name, (model, predict_args) in worker_models.items():
+            results = model(tensor, imgsz=imgsz, verbose=False, **predict_args)
+            boxes[name] = restore_boxes(results[0], metas[0]).boxes.data.cpu().numpy()
+        frames.append((source, index, boxes))
+    return frames
+
+
+# 감지 결과와 클래스별 개수를 CSV 파일에 이어서 씀
+# 체크포인트에는 마지막으로 확정된 파일 크기를 저장하고, 이어서 실행할 때 그 뒤에 쓰인 부분은 잘라냄
+class CsvSink:
+    def __init__(self, output_dir, state=None):
+        self.files = {}
+        self.writers = {}
+        for name, columns in (('detections', detection_columns), ('counts', count_columns)):
+            path = os.path.join(output_dir, f'{name}.csv')
+            offset = (state or {}).get(name, 0)
+            f = open(path, 'r+' if offset else 'w', newline='', encoding='utf-8')
+            f.truncate(offset)
+            f.seek(offset)
+            self.files[name] = f
+            self.writers[name] = csv.writer(f)
+            if not offset:
+                self.writers[name].writerow(columns)
+
+    def write(self, name, rows):
+        self.writers[name].writerows(rows)
+
+    def commit(self):
+        state = {}
+        for name, f in self.files.items():
+            f.flush()
+            os.fsync(f.fileno())
+            state[name] = f.tell()
+        return state
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+# Parquet은 이어 쓸 수 없으므로 체크포인트마다 part 파일을 하나씩 씀 (pyarrow 필요)
+# 이어서 실행할 때 체크포인트 이후에 쓰인 part 파일은 삭제
+class ParquetSink:
+    def __init__(self, output_dir, state=None):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.output_dir = output_dir
+        self.part = (state or {}).get('part', 0)
+        self.rows = {'detections': [], 'counts': []}
+        self.columns = {'detections': detection_columns, 'counts': count_columns}
+        for name in self.rows:
+            os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+            for path in glob.glob(os.path.join(output_dir, name, 'part-*.parquet')):
+                if int(os.path.basename(path)[5:-8]) >= self.part:
+                    os.remove(path)
+
+    def write(self, name, rows):
+        self.rows[name].extend(rows)
+
+    def commit(self):
+        for name, rows in self.rows.items():
+            if rows:
+                columns = {column: list(values) for column, values in zip(self.columns[name], zip(*rows))}
+                path = os.path.join(self.output_dir, name, f'part-{self.part:06d}.parquet')
+                self.parquet.write_table(self.pyarrow.table(columns), path)
+                rows.clear()
+        self.part += 1
+        return {'part': self.part}
+
+    def close(self):
+        pass
+
+
+# 체크포인트는 임시 파일에 쓴 뒤 이름을 바꿔서 중간에 멈춰도 깨지지 않도록 함
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, settings):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint['settings'] != settings:
+        raise SystemExit(f'{path} was written with different inputs or options, use --restart to start over.')
+    return checkpoint
+
+
+def to_rows(source, index, boxes):
+    detections, counts = [], []
+    for name, data in boxes.items():
+        names = class_names[name]
+        for x1, y1, x2, y2, conf, label_id in data.tolist():
+            label_id = int(label_id)
+            detections.append([source, index, name, label_id, names.get(label_id, 'Unknown'), round(conf, 4),
+                               int(x1), int(y1), int(x2), int(y2)])
+        per_class = count_classes(data[:, 5].astype(int), len(names))
+        counts.extend([source, index, name, label, int(per_class[label_id])] for label_id, label in names.items())
+    return detections, counts
+
+
+# 작업을 워커 풀에 최대 workers x prefetch개까지만 미리 넣고, 들어온 순서대로 결과를 저장
+# 입력이 아무리 많아도 메모리에는 대기 중인 작업과 체크포인트 사이의 결과만 남음
+def run_batch(inputs, output_dir, model_names, config, imgsz=640, workers=2, prefetch=2, chunk=16, stride=1,
+              output_format='csv', checkpoint_every=20, restart=False):
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, 'checkpoint.json')
+    settings = {'inputs': inputs, 'models': model_names, 'imgsz': imgsz, 'chunk': chunk, 'stride': stride,
+                'format': output_format}
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, settings)
+    if checkpoint is None:
+        checkpoint = {'settings': settings, 'tasks_done': 0, 'frames': 0, 'sink': None}
+    sink = (ParquetSink if output_format == 'parquet' else CsvSink)(output_dir, checkpoint['sink'])
+
+    model_specs = {}
+    for name in model_names:
+        model_config = config['models'][name]
+        # 변환(export)은 부모 프로세스에서 한 번만 해 두고 워커는 캐시된 모델을 불러옴
+        load_model(model_config['weights'], model_config['backend'], imgsz, config['calibration_dir'])
+        profile = model_config['profile']
+        model_specs[name] = (model_config['weights'], model_config['backend'],
+                             {'conf': profile['conf'], 'iou': profile['iou']})
+
+    tasks = iter_tasks(inputs, chunk, stride)
+    for _ in range(checkpoint['tasks_done']):
+        next(tasks, None)
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    ctx = multiprocessing.get_context('spawn')
+    start = time.time()
+    frames = 0
+    with ctx.Pool(workers, initializer=init_worker,
+                  initargs=(model_specs, imgsz, config['calibration_dir'], threads)) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < workers * prefetch:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pending.append(pool.apply_async(run_task, (task,)))
+            if not pending:
+                break
+
+            for source, index, boxes in pending.popleft().get():
+                detections, counts = to_rows(source, index, boxes)
+                sink.write('detections', detections)
+                sink.write('counts', counts)
+                frames += 1
+            checkpoint['tasks_done'] += 1
+
+            if checkpoint['tasks_done'] % checkpoint_every == 0 or not pending:
+                checkpoint['sink'] = sink.commit()
+                checkpoint['frames'] += frames
+                frames = 0
+                save_checkpoint(checkpoint_path, checkpoint)
+                elapsed = time.time() - start
+                print(f"{checkpoint['tasks_done']} tasks, {checkpoint['frames']} frames ({elapsed:.0f} s)")
+
+    sink.close()
+    return checkpoint
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='저장된 이미지/동영상을 abnormal, growth 모델로 한 번에 분석 (중단하면 이어서 실행)')
+    parser.add_argument('inputs', nargs='+', help='이미지 폴더, glob 패턴 (예: "captures/**/*.jpg"), 동영상 또는 이미지 파일')
+    parser.add_argument('--output', default='batch_output', help='결과 폴더 (detections, counts, checkpoint.json)')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv', help='결과 파일 형식 (parquet은 pyarrow 필요)')
+    parser.add_argument('--models', nargs='+', default=['abnormal', 'growth'], help='실행할 모델 (설정 파일의 models 키)')
+    parser.add_argument('--imgsz', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='워커 프로세스 수')
+    parser.add_argument('--prefetch', type=int, default=2, help='워커마다 미리 넣어 둘 작업 수')
+    parser.add_argument('--chunk', type=int, default=16, help='작업 하나에 들어가는 이미지/프레임 수')
+    parser.add_argument('--stride', type=int, default=1, help='동영상에서 N 프레임마다 한 장씩 분석')
+    parser.add_argument('--checkpoint-every', type=int, default=20, help='N개 작업마다 결과를 저장하고 체크포인트 기록')
+    parser.add_argument('--restart', action='store_true', help='체크포인트를 무시하고 처음부터 다시 실행')
+    args = parser.parse_args()
+
+    config = load_config()
+    checkpoint = run_batch(args.inputs, args.output, args.models, config, args.imgsz or config['imgsz'], args.workers,
+                           args.prefetch, args.chunk, args.stride, args.format, args.checkpoint_every, args.restart)
+    print(f"Done: {checkpoint['frames']} frames -> {args.output}")
@@ -0,0 +1,317 @@
+import argparse
+import json
+import resource
+import threading
+import time
+
+import numpy as np
+
+import scheduler as scheduler_module
+from backends import load_model
+from cameras import ReplayCapture
+from config import load_config
+from frame_buffer import FrameRing, start_capture
+from pacing import PacingController
+from postprocess import extract_detections, count_classes, draw_detections
+from publisher import ImagePublisher
+from scheduler import InferenceScheduler
+
+
+# grab: 캡처 스레드의 읽기/디코딩, draw / encode: 이미지 요청 시(ImagePublisher.latest) 수행하는 박스 그리기와 JPEG 인코딩
+stages = ('grab', 'preprocess', 'inference', 'postprocess', 'publish', 'draw', 'encode')
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    values = np.array(samples) * 1000
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+    }
+
+
+# 여러 스레드(캡처, 스케줄러, 후처리)에서 기록하는 단계별 시간 (list.append는 스레드 간에 안전)
+class Timings:
+    def __init__(self, names):
+        self.names = names
+        self.reset()
+
+    def reset(self):
+        self.samples = {name: [] for name in self.names}
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+
+
+# 측정이 끝나면 진행 중인 작업(캡처, 추론, 후처리)이 끝나기를 기다리고 이후 작업은 막음
+# 데몬 스레드가 추론이나 디코딩 중에 인터프리터가 종료되면 프로세스가 비정상 종료되므로 사용
+class WorkGate:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.active = 0
+        self.closed = False
+
+    def __enter__(self):
+        with self.cond:
+            self.cond.wait_for(lambda: not self.closed)
+            self.active += 1
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.wait_for(lambda: self.active == 0)
+
+
+# 캡처 스레드의 grab 시간을 측정하는 캡처 래퍼 (fps 속도 조절은 여기서 해서 대기 시간은 측정에서 제외)
+class TimedCapture:
+    def __init__(self, capture, timings, gate, fps=None):
+        self.capture = capture
+        self.timings = timings
+        self.gate = gate
+        self.period = 1.0 / fps if fps else 0
+        self.next_grab = 0
+
+    def grab(self):
+        if self.period:
+            now = time.time()
+            if now < self.next_grab:
+                time.sleep(self.next_grab - now)
+            self.next_grab = max(now, self.next_grab) + self.period
+        with self.gate:
+            t = time.perf_counter()
+            ok = self.capture.grab()
+            self.timings.add('grab', time.perf_counter() - t)
+        return ok
+
+    def retrieve(self):
+        return self.capture.retrieve()
+
+
+# 프레임이 버퍼에 들어간 시각을 기록하는 FrameRing (후처리가 끝날 때까지의 전체 지연 시간 계산용)
+class TimedRing(FrameRing):
+    def __init__(self, size=4):
+        super().__init__(size)
+        self.put_times = {}  # id(frame) -> 버퍼에 들어간 시각 (최근 프레임만 보관)
+
+    def put(self, frame):
+        self.put_times.pop(id(frame), None)
+        self.put_times[id(frame)] = time.perf_counter()
+        if len(self.put_times) > 64:
+            self.put_times.pop(next(iter(self.put_times)))
+        return super().put(frame)
+
+
+# JPEG 인코딩 시간을 측정하는 ImagePublisher (그리기 시간은 render 함수에서 따로 측정)
+class TimedPublisher(ImagePublisher):
+    def __init__(self, render, timings):
+        super().__init__(render)
+        self.timings = timings
+
+    def encode(self, frame):
+        t = time.perf_counter()
+        data = super().encode(frame)
+        self.timings.add('encode', time.perf_counter() - t)
+        return data
+
+
+# 모델 호출 시간을 측정하는 래퍼 (스케줄러는 submit이 없으면 같은 스레드에서 호출함)
+class TimedModel:
+    def __init__(self, model, name, timings, model_timings, gate):
+        self.model = model
+        self.name = name
+        self.timings = timings
+        self.model_timings = model_timings
+        self.gate = gate
+
+    def __call__(self, *args, **kwargs):
+        with self.gate:
+            t = time.perf_counter()
+            results = self.model(*args, **kwargs)
+            elapsed = time.perf_counter() - t
+        self.timings.add('inference', elapsed)
+        self.model_timings.add(self.name, elapsed)
+        return results
+
+
+# main.py와 같은 구성(캡처 스레드 -> FrameRing -> InferenceScheduler -> 모델별 후처리 스레드 -> ImagePublisher)으로
+# 녹화 영상을 처리하면서 단계별 시간을 측정
+# models: {이름: (모델, class_names, class_colors)}, frames: 모델마다 처리할 결과 수
+# 이미지 요청이 결과마다 한 번씩 온다고 가정하고 지연 렌더링(latest)까지 측정
+# 입력 크기는 imgsz로 고정하고 목표 FPS 제한 없이 추론이 끝나는 대로 다음 프레임을 처리
+# capture는 속도 제한 없이 읽는 캡처 (ReplayCapture(source)), fps로 카메라 속도를 맞춤
+def run_pipeline(capture, models, frames=300, imgsz=640, warmup=5, max_batch=4, change_threshold=None,
+                 max_staleness=60.0, fps=30, timeout=600):
+    timings = Timings(stages)
+    model_timings = Timings(tuple(models))
+    latencies = []  # 프레임이 버퍼에 들어간 뒤 후처리가 끝날 때까지의 시간
+    counts = {name: 0 for name in models}
+    state = {'start': None}
+    lock = threading.Lock()
+    done = threading.Event()
+    gate = WorkGate()
+
+    # 전처리는 스케줄러 모듈의 함수를 감싸서 측정
+    original_preprocess = scheduler_module.preprocess
+
+    def timed_preprocess(frames, size):
+        t = time.perf_counter()
+        result = original_preprocess(frames, size)
+        timings.add('preprocess', time.perf_counter() - t)
+        return result
+
+    scheduler_module.preprocess = timed_preprocess
+
+    # 모델마다 warmup개를 처리한 뒤부터 측정 (모델 초기화 시간 제외)
+    def progress(name):
+        with lock:
+            counts[name] += 1
+            if state['start'] is None:
+                if min(counts.values()) >= warmup:
+                    timings.reset()
+                    model_timings.reset()
+                    latencies.clear()
+                    for key in counts:
+                        counts[key] = 0
+                    state['start'] = time.perf_counter()
+            elif min(counts.values()) >= frames:
+                done.set()
+
+    def make_handler(name, class_names, publisher, ring):
+        def handler(source, frame, results, unchanged):
+            with gate:
+                t = time.perf_counter()
+                detections = extract_detections(results)
+                count_classes(detections.cls, len(class_names))
+                timings.add('postprocess', time.perf_counter() - t)
+
+                t = time.perf_counter()
+                publisher.publish(frame, detections)
+                timings.add('publish', time.perf_counter() - t)
+
+                publisher.latest()
+
+            put_time = ring.put_times.get(id(frame))
+            if put_time is not None:
+                latencies.append(time.perf_counter() - put_time)
+            progress(name)
+        return handler
+
+    ring = TimedRing()
+    scheduler = InferenceScheduler({'replay': ring}, max_batch)
+    for name, (model, class_names, class_colors) in models.items():
+        def render(frame, detections, names=class_names, colors=class_colors):
+            t = time.perf_counter()
+            frame = draw_detections(frame.copy(), detections, names, colors)
+            timings.add('draw', time.perf_counter() - t)
+            return frame
+
+        publisher = TimedPublisher(render, timings)
+        scheduler.add_model(name, TimedModel(model, name, timings, model_timings, gate),
+                            make_handler(name, class_names, publisher, ring),
+                            PacingController(target_fps=1000, cpu_budget=1.0, sizes=(imgsz,)),
+                            change_threshold, max_staleness)
+
+    try:
+        start_capture(TimedCapture(capture, timings, gate, fps), ring, 'replay')
+        scheduler.start()
+        finished = done.wait(timeout)
+    finally:
+        gate.close()
+        scheduler_module.preprocess = original_preprocess
+
+    with lock:
+        elapsed = time.perf_counter() - state['start'] if state['start'] is not None else 0.0
+        processed = dict(counts)
+        samples = {stage: list(values) for stage, values in timings.samples.items()}
+        model_samples = {name: list(values) for name, values in model_timings.samples.items()}
+        frame_latencies = list(latencies)
+
+    return {
+        'frames': min(processed.values()),
+        'completed': finished,
+        'throughput_fps': min(processed.values()) / elapsed if elapsed else 0.0,
+        'latency': percentiles(frame_latencies),
+        'stages': {stage: percentiles(values) for stage, values in samples.items()},
+        'inference_by_model': {name: percentiles(values) for name, values in model_samples.items()},
+        'scheduler': scheduler.stats(),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+# 기준 결과와 비교해서 tolerance(비율)보다 느려진 단계를 찾음
+def compare(report, baseline, tolerance=0.1):
+    regressions = []
+    for stage, current in [('frame', report['latency']), *report['stages'].items()]:
+        previous = baseline['latency'] if stage == 'frame' else baseline['stages'].get(stage)
+        if current is None or previous is None:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if previous[key] > 0 and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f'{stage} {key}: {previous[key]:.2f} -> {current[key]:.2f}')
+
+    if report['throughput_fps'] < baseline['throughput_fps'] * (1 - tolerance):
+        regressions.append(f"throughput_fps: {baseline['throughput_fps']:.2f} -> {report['throughput_fps']:.2f}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='녹화 영상/이미지 폴더로 감지 파이프라인 단계별 성능 측정')
+    parser.add_argument('source', help='동영상 파일 또는 이미지 폴더')
+    parser.add_argument('--frames', type=int, default=300, help='모델마다 측정할 결과 수')
+    parser.add_argument('--fps', type=float, default=30, help='녹화 영상을 읽는 속도 (카메라 FPS)')
+    parser.add_argument('--max-batch', type=int, default=4, help='스케줄러의 최대 배치 크기')
+    parser.add_argument('--change-threshold', type=float, default=None,
+                        help='장면 변화가 이 값 이하면 추론을 건너뜀 (기본값: 항상 추론)')
+    parser.add_argument('--backend', default=None, help='추론 백엔드 (기본값: 설정 파일의 모델별 backend)')
+    parser.add_argument('--imgsz', type=int, default=None)
+    parser.add_argument('--models', nargs='+', default=['abnormal', 'growth'], help='측정할 모델 (설정 파일의 models 키)')
+    parser.add_argument('--output', default='benchmark_report.json', help='결과 저장 경로')
+    parser.add_argument('--baseline', default=None, help='비교할 기준 결과 파일')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='이 비율보다 느려지면 성능 저하로 판단')
+    args = parser.parse_args()
+
+    config = load_config()
+    imgsz = args.imgsz or config['imgsz']
+    class_names = {
+        'abnormal': ({0: 'hole', 1: 'wither'}, {0: (255, 0, 0), 1: (127, 255, 212)}),
+        'growth': ({0: 'level_1', 1: 'level_2', 2: 'level_3'}, {0: (0, 0, 255), 1: (0, 255, 0), 2: (255, 0, 255)}),
+    }
+    models = {}
+    for name in args.models:
+        model_config = config['models'][name]
+        backend = args.backend or model_config['backend']
+        model = load_model(model_config['weights'], backend, imgsz, config['calibration_dir'])
+        models[name] = (model, *class_names[name])
+
+    report = run_pipeline(ReplayCapture(args.source), models, args.frames, imgsz, max_batch=args.max_batch,
+                          change_threshold=args.change_threshold, fps=args.fps)
+    if not report['completed']:
+        print(f"Timed out after {report['frames']} frames")
+    report.update({'source': args.source, 'imgsz': imgsz, 'backend': args.backend, 'models': args.models,
+                   'fps': args.fps, 'max_batch': args.max_batch, 'change_threshold': args.change_threshold})
+    for stage, summary in report['stages'].items():
+        if summary is not None:
+            print(f"{stage:12s} p50 {summary['p50_ms']:7.2f} ms  p95 {summary['p95_ms']:7.2f} ms  p99 {summary['p99_ms']:7.2f} ms")
+    latency = report['latency']
+    if latency is not None:
+        print(f"{'end-to-end':12s} p50 {latency['p50_ms']:7.2f} ms  p95 {latency['p95_ms']:7.2f} ms  p99 {latency['p99_ms']:7.2f} ms")
+    print(f"throughput {report['throughput_fps']:.2f} fps, peak RSS {report['peak_rss_mb']:.0f} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            raise SystemExit(1)
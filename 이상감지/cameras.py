@@ -0,0 +1,142 @@
+import glob
+import os
+import time
+
+import cv2
+
+from frame_buffer import FrameRing, start_capture
+from roi import RegionMask
+from scheduler import InferenceScheduler
+
+
+# source: 웹캠 인덱스(int) / 동영상 파일 경로 / RTSP 주소 / 이미지 폴더 (녹화 이미지 재생)
+def open_camera(source):
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, str) and os.path.isdir(source):
+        return ReplayCapture(source, fps=30)
+    return cv2.VideoCapture(source)
+
+
+# 녹화된 동영상 또는 이미지 폴더를 웹캠처럼 읽는 VideoCapture 대체 클래스
+# loop가 True면 끝까지 읽은 뒤 처음부터 다시 읽음
+class ReplayCapture:
+    def __init__(self, source, loop=True, fps=None):
+        self.loop = loop
+        self.period = 1.0 / fps if fps else 0  # fps를 주면 실제 카메라처럼 그 속도로만 프레임을 읽음
+        self.next_grab = 0
+        self.frame = None
+        if os.path.isdir(source):
+            self.images = sorted(p for pattern in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(source, pattern)))
+            self.index = 0
+            self.video = None
+            if not self.images:
+                raise FileNotFoundError(f'No images in {source}')
+        else:
+            self.images = None
+            self.video = cv2.VideoCapture(source)
+            if not self.video.isOpened():
+                raise FileNotFoundError(f'Cannot open {source}')
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.period:
+            now = time.time()
+            if now < self.next_grab:
+                time.sleep(self.next_grab - now)
+            self.next_grab = max(now, self.next_grab) + self.period
+
+        if self.images is not None:
+            if self.index >= len(self.images):
+                if not self.loop:
+                    return False
+                self.index = 0
+            self.frame = cv2.imread(self.images[self.index])
+            self.index += 1
+            return self.frame is not None
+
+        ok, self.frame = self.video.read()
+        if not ok and self.loop:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, self.frame = self.video.read()
+        return ok
+
+    def retrieve(self):
+        return self.frame is not None, self.frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
+
+# 설정 파일의 카메라 목록으로 만든 카메라 레지스트리 (카메라 ID -> 캡처 장치와 프레임 버퍼)
+class CameraRegistry:
+    def __init__(self, camera_configs):
+        self.cameras = {}
+        for camera_id, camera_config in camera_configs.items():
+            self.cameras[camera_id] = {
+                'source': camera_config['source'],
+                'capture': open_camera(camera_config['source']),
+                'ring': FrameRing(),
+                'roi': RegionMask(camera_config['roi']) if camera_config.get('roi') else None,
+            }
+
+    def ids(self):
+        return list(self.cameras)
+
+    def ring(self, camera_id):
+        return self.cameras[camera_id]['ring']
+
+    # 카메라마다 캡처 스레드 시작 (장치 접근은 캡처 스레드만 수행)
+    def start(self):
+        for camera_id, camera in self.cameras.items():
+            start_capture(camera['capture'], camera['ring'], camera_id)
+
+
+# 카메라들을 워커들에 나눠서 처리하는 풀
+# 워커마다 모델을 따로 받아서 워커끼리 동시에 추론 (같은 모델 객체를 여러 스레드가 동시에 호출하지 않음)
+# 그만큼 모델 메모리는 워커 수 x 모델 수만큼 사용 (processes 모드는 모델마다 프로세스 하나를 모든 워커가 공유)
+class WorkerPool:
+    def __init__(self, registry, workers=1, max_batch=4):
+        camera_ids = registry.ids()
+        workers = max(1, min(workers, len(camera_ids)))
+        self.schedulers = []
+        for i in range(workers):
+            rings = {camera_id: registry.ring(camera_id) for camera_id in camera_ids[i::workers]}
+            rois = {camera_id: registry.cameras[camera_id]['roi'] for camera_id in rings
+                    if registry.cameras[camera_id]['roi'] is not None}
+            self.schedulers.append(InferenceScheduler(rings, max_batch, rois))
+
+    # make_model: 워커마다 모델을 만드는 함수, make_pacer: 워커마다 새 PacingController를 만드는 함수 (추론 시간은 워커별로 측정)
+    def add_model(self, name, make_model, handler, make_pacer, change_threshold=None, max_staleness=60.0, tiler=None,
+                  detect_every=1, profile=None):
+        for scheduler in self.schedulers:
+            scheduler.add_model(name, make_model(), handler, make_pacer(), change_threshold, max_staleness, tiler,
+                                detect_every, profile)
+
+    def start(self):
+        for scheduler in self.schedulers:
+            scheduler.start()
+
+    # 모델별 추론/건너뛴 횟수 합계와 워커별 실행 속도
+    def stats(self):
+        stats = {}
+        for scheduler in self.schedulers:
+            for name, job_stats in scheduler.stats().items():
+                model_stats = stats.setdefault(name, {'inferred': 0, 'skipped': 0, 'workers': []})
+                model_stats['inferred'] += job_stats.pop('inferred')
+                model_stats['skipped'] += job_stats.pop('skipped')
+                job_stats.pop('skip_ratio')
+                model_stats['workers'].append(job_stats)
+
+        for model_stats in stats.values():
+            total = model_stats['inferred'] + model_stats['skipped']
+            model_stats['skip_ratio'] = model_stats['skipped'] / total if total else 0.0
+        return stats
@@ -0,0 +1,62 @@
+import argparse
+import ast
+import os
+
+
+# 다른 폴더에서 따로 실행하기 위해 복사해 둔 모듈 -> 원본 모듈 목록 (저장소 최상위 기준 경로)
+# 사본은 원본의 일부 함수/클래스만 가질 수 있지만, 같은 이름의 정의는 원본과 내용이 같아야 함
+copies = {
+    '성장관리/backends.py': ['이상감지/backends.py'],
+    '성장관리/pacing.py': ['이상감지/pacing.py'],
+    '성장관리/postprocess.py': ['이상감지/postprocess.py'],
+    '성장관리/profiles.py': ['이상감지/profiles.py'],
+    '성장관리/quantize.py': ['이상감지/quantize.py', '이상감지/scheduler.py'],
+    '모델학습/synthetic_holes.py': ['이상감지/Augmentation/synthetic_holes.py'],
+}
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 최상위 함수, 클래스, 변수 정의 -> AST 덤프 (주석과 줄바꿈 차이는 무시)
+def definitions(path):
+    with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+
+    result = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            result[node.name] = ast.dump(node)
+        elif isinstance(node, ast.Assign) and all(isinstance(target, ast.Name) for target in node.targets):
+            for target in node.targets:
+                result[target.id] = ast.dump(node.value)
+    return result
+
+
+# 사본의 정의 중 원본과 다르거나 원본에 없는 것
+def find_drift(copy_path, original_paths):
+    originals = {}
+    for path in original_paths:
+        originals.update(definitions(path))
+
+    problems = []
+    for name, dump in definitions(copy_path).items():
+        if name not in originals:
+            problems.append(f'{copy_path}: {name} is not in {", ".join(original_paths)}')
+        elif dump != originals[name]:
+            problems.append(f'{copy_path}: {name} differs from {", ".join(original_paths)}')
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='복사해 둔 모듈이 원본과 달라졌는지 확인 (다르면 종료 코드 1)')
+    parser.add_argument('files', nargs='*', help='확인할 사본 (기본값: 전체)')
+    args = parser.parse_args()
+
+    problems = []
+    for copy_path in args.files or copies:
+        problems += find_drift(copy_path, copies[copy_path])
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
+    print(f'{len(args.files or copies)} copies match their originals.')
@@ -0,0 +1,81 @@
+import copy
+import json
+import os
+
+
+# 기본 설정 (config.json이 있으면 같은 키의 값을 덮어씀)
+DEFAULT_CONFIG = {
+    # 모델별 가중치 파일과 추론 백엔드 (pytorch / onnx / openvino / onnx-int8)
+    # change_threshold: 이전 추론 프레임과 비교해서 가장 많이 바뀐 칸(화면의 1/16 x 1/12)의 평균 밝기 차이가 이 값 이하면 추론을 건너뜀 (None이면 항상 추론)
+    # max_staleness: 변화가 없어도 이 시간(초)이 지나면 다시 추론
+    # target_fps: 목표 실행 횟수 (초당), cpu_budget: 추론에 쓸 수 있는 시간 비율 (넘으면 속도와 입력 크기를 낮춤)
+    # profile: 입력 크기 (imgsz 이하), 감지 기준 (conf, iou), 최소 실행 간격 (interval초, null이면 target_fps만 따름),
+    #          실행 시간대 (windows [["HH:MM", "HH:MM"], ...], 비어 있으면 항상), /admin/profiles로 실행 중에 변경 가능
+    'models': {
+        'abnormal': {'weights': 'abnormal.pt', 'backend': 'onnx', 'change_threshold': 4.0, 'max_staleness': 30,
+                     'target_fps': 10, 'cpu_budget': 0.5,
+                     'profile': {'imgsz': 640, 'conf': 0.25, 'iou': 0.7, 'interval': None, 'windows': []},
+                     # 타일 추론 (작은 구멍 감지용): grid [가로, 세로] 타일 수, overlap 겹치는 비율,
+                     # roi [x1, y1, x2, y2] 타일로 나눌 영역 (null이면 전체, 카메라 roi가 있으면 잘린 영역 기준 좌표), iou 타일 간 중복 박스 제거 기준
+                     'tiling': {'enabled': False, 'grid': [2, 2], 'overlap': 0.2, 'roi': None, 'iou': 0.5},
+                     # 객체 추적: 개수와 알림을 고유 객체(트랙) 기준으로 계산, detect_every번에 한 번만 추론하고 그 사이는 위치 예측
+                     # high_conf 이상인 박스로만 새 트랙 생성, min_hits번 감지되면 확정, max_age초 동안 안 보이면 삭제
+                     'tracking': {'enabled': False, 'detect_every': 3, 'iou': 0.3, 'high_conf': 0.5, 'min_hits': 2,
+                                  'max_age': 5.0}},
+        'growth': {'weights': 'growth.pt', 'backend': 'onnx', 'change_threshold': 4.0, 'max_staleness': 600,
+                   'target_fps': 10, 'cpu_budget': 0.25,
+                   'profile': {'imgsz': 640, 'conf': 0.25, 'iou': 0.7, 'interval': None, 'windows': []}},
+    },
+    # 카메라 ID -> source (웹캠 인덱스 / 동영상 파일 경로 / RTSP 주소), 첫 번째 카메라가 기본 카메라
+    # roi: 추론할 관심 영역 목록 (사각형 [x1, y1, x2, y2] 또는 다각형 [[x, y], ...], 픽셀), 없으면 전체 프레임
+    'cameras': {
+        'cam0': {'source': 2, 'roi': None},
+    },
+    # 추론 워커 수 (카메라들을 워커에 나눠 배정, threads 모드는 워커마다 모델을 따로 로드하므로 모델 메모리도 워커 수만큼 사용)
+    'workers': 1,
+    # 추론 실행 방식: 'threads' (Flask와 같은 프로세스) / 'processes' (모델마다 별도 프로세스, 프레임은 공유 메모리로 전달)
+    'execution': 'threads',
+    # processes 모드에서 입력 텐서를 담는 공유 메모리 슬롯 수
+    'shared_slots': 4,
+    # 최대 모델 입력 크기 (모델 변환과 공유 메모리 슬롯 크기 기준), 추론이 느리면 min_imgsz까지 낮춤
+    'imgsz': 640,
+    'min_imgsz': 320,
+    # 감지 이미지를 static 폴더에도 저장할지 여부 (API는 메모리의 이미지를 바로 제공)
+    'save_images': False,
+    # /reset_status 후 클래스별로 status를 False로 고정하는 시간 (초)
+    'status_suppression': {'hole': 100, 'wither': 100},
+    # 감지 기록 저장소 (SQLite), flush_interval초마다 모아서 저장, 원본 결과는 raw_retention_days일 동안 보관
+    'history': {'path': './history.db', 'flush_interval': 5, 'raw_retention_days': 7},
+    # 이상 감지 알림 전송 (enabled가 true일 때만), window초 동안의 감지는 한 번의 요청으로 합쳐서 전송
+    # 전송에 실패한 알림은 spill_path 파일에 저장했다가 백엔드가 다시 응답하면 전송
+    'notification': {'enabled': False, 'url': 'http://3.34.153.235:8080/api/notification/save', 'user_id': 1,
+                     'window': 10, 'timeout': 5, 'max_retries': 3, 'spill_path': './notification_spill.jsonl'},
+    # 로그 수준 (DEBUG면 프레임마다 감지 결과를 출력, INFO면 상태가 바뀔 때만 출력)
+    'log_level': 'INFO',
+    # onnx-int8 백엔드의 보정에 사용할 웹캠 캡처 이미지 폴더
+    'calibration_dir': './calibration',
+    # /admin 요청에 필요한 X-Admin-Token 헤더 값 (null이면 localhost에서 온 요청만 허용)
+    'admin_token': None,
+}
+
+
+# 키가 사용자마다 다른 항목은 기본값과 합치지 않고 설정 파일의 값으로 바꿈 (예: 기본 카메라 cam0가 남지 않도록)
+REPLACED_KEYS = ('cameras', 'status_suppression')
+
+
+def merge(base, override, replaced=()):
+    for key, value in override.items():
+        if key not in replaced and isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path=None):
+    path = path or os.environ.get('NUFARM_CONFIG', 'config.json')
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            merge(config, json.load(f), REPLACED_KEYS)
+    return config
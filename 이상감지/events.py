@@ -0,0 +1,70 @@
+import collections
+import json
+import threading
+
+
+# status, class_counts 등 상태가 실제로 바뀔 때만 구독자들에게 이벤트를 보내는 브로드캐스터 (SSE)
+# 구독자마다 전달 스레드를 만들지 않고, 모든 구독자가 하나의 조건 변수에서 새 이벤트를 기다림
+class EventBroadcaster:
+    def __init__(self, history=256):
+        self.cond = threading.Condition()
+        self.version = 0
+        self.events = collections.deque(maxlen=history)  # 최근 이벤트 (version, topic, data), 재연결 시 이어서 전송
+        self.latest = {}  # topic -> 마지막 data
+        self.subscribers = 0
+
+    # topic: (이벤트 이름, 카메라 ID), 이전 값과 같으면 보내지 않음
+    def publish(self, topic, data):
+        with self.cond:
+            if self.latest.get(topic) == data:
+                return False
+            self.latest[topic] = data
+            self.version += 1
+            self.events.append((self.version, topic, data))
+            self.cond.notify_all()
+            return True
+
+    # last_version 이후의 이벤트 (처음 연결했거나 보관 범위를 벗어났으면 topic별 현재 상태 전체)
+    def events_since(self, last_version=None):
+        with self.cond:
+            if last_version is None or (self.events and self.events[0][0] > last_version + 1):
+                return [(self.version, topic, data) for topic, data in self.latest.items()]
+            return [event for event in self.events if event[0] > last_version]
+
+    def wait_events(self, last_version, timeout):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.version > last_version, timeout):
+                return []
+        return self.events_since(last_version)
+
+
+def format_event(version, topic, data):
+    name, camera_id = topic
+    payload = json.dumps({'camera': camera_id, **data}, separators=(',', ':'))
+    return f'id: {version}\nevent: {name}\ndata: {payload}\n\n'
+
+
+# SSE 스트림: 처음에 현재 상태를 보내고, 이후에는 바뀐 내용만 전송
+# 변화가 없으면 heartbeat초마다 주석 줄을 보내서 연결을 유지
+def sse_stream(broadcaster, camera_id=None, last_version=None, heartbeat=15):
+    with broadcaster.cond:
+        broadcaster.subscribers += 1
+    try:
+        if last_version is not None and last_version > broadcaster.version:
+            last_version = None  # 서버가 다시 시작된 경우 현재 상태부터 다시 받음
+        events = broadcaster.events_since(last_version)
+        last_version = last_version or 0
+
+        yield 'retry: 3000\n\n'
+        while True:
+            for version, topic, data in events:
+                last_version = max(last_version, version)
+                if camera_id is None or topic[1] == camera_id:
+                    yield format_event(version, topic, data)
+
+            events = broadcaster.wait_events(last_version, heartbeat)
+            if not events:
+                yield ': heartbeat\n\n'
+    finally:
+        with broadcaster.cond:
+            broadcaster.subscribers -= 1
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from metrics import TimedLock, frames_grabbed, frames_captured
+
+
+# 캡처된 프레임을 버전 번호와 함께 보관하는 링 버퍼
+# 프레임은 참조로 전달되므로 소비자는 받은 프레임을 직접 수정하면 안 됨
+class FrameRing:
+    def __init__(self, size=4):
+        self.size = size
+        self.slots = [None] * size  # (version, timestamp, frame)
+        self.version = 0
+        self.demand = 0  # 새 프레임을 기다리는 소비자 수
+        self.events = set()  # 새 프레임이 들어오면 set할 이벤트 (여러 버퍼를 한 번에 기다리는 소비자용)
+        self.cond = threading.Condition()
+
+    def put(self, frame):
+        with TimedLock(self.cond, 'frame_ring'):
+            self.version += 1
+            self.slots[self.version % self.size] = (self.version, time.time(), frame)
+            self.cond.notify_all()
+            for event in self.events:
+                event.set()
+            return self.version
+
+    # 캡처 스레드에 새 프레임을 요청하고, 들어오면 event를 set함 (release를 호출할 때까지)
+    def request(self, event):
+        with self.cond:
+            self.demand += 1
+            self.events.add(event)
+
+    def release(self, event):
+        with self.cond:
+            self.demand -= 1
+            self.events.discard(event)
+
+    # 마지막 프레임이 들어온 시각 (아직 없으면 None)
+    def last_time(self):
+        with self.cond:
+            slot = self.slots[self.version % self.size]
+        return slot[1] if slot is not None else None
+
+    def wanted(self):
+        with self.cond:
+            return self.demand > 0
+
+    def _fresh(self, last_version, max_age):
+        if self.version <= last_version:
+            return False
+        if max_age is None:
+            return True
+        return time.time() - self.slots[self.version % self.size][1] <= max_age
+
+    # last_version 이후의 가장 최신 프레임을 반환 (중간 프레임은 건너뜀)
+    # max_age보다 오래된 프레임이면 캡처 스레드에 새 프레임을 요청하고 기다림
+    def get_latest(self, last_version=0, max_age=None, timeout=None):
+        with TimedLock(self.cond, 'frame_ring'):
+            if not self._fresh(last_version, max_age):
+                self.demand += 1
+                try:
+                    self.cond.wait_for(lambda: self._fresh(last_version, max_age), timeout)
+                finally:
+                    self.demand -= 1
+                if not self._fresh(last_version, max_age):
+                    return None
+            return self.slots[self.version % self.size]
+
+    # last_version 이후에 쌓여 있는 프레임들을 오래된 순서로 반환 (최신 limit개만)
+    def get_since(self, last_version, limit=None):
+        with self.cond:
+            first = max(last_version + 1, self.version - self.size + 1, 1)
+            slots = [self.slots[v % self.size] for v in range(first, self.version + 1)]
+        if limit:
+            slots = slots[-limit:]
+        return slots
+
+
+# 웹캠에서 프레임을 가져오는 전용 스레드
+# grab()은 계속 호출해서 버퍼를 비우고, 디코딩(retrieve)은 소비자가 기다릴 때만 한 번 수행
+def capture_loop(camera, ring, name='camera'):
+    while True:
+        if not camera.grab():
+            time.sleep(0.1)
+            continue
+        frames_grabbed.inc(camera=name)
+
+        if ring.wanted():
+            ret, frame = camera.retrieve()
+            if ret:
+                ring.put(frame)
+                frames_captured.inc(camera=name)
+
+
+def start_capture(camera, ring, name='camera'):
+    thread = threading.Thread(target=capture_loop, args=(camera, ring, name))
+    thread.daemon = True
+    thread.start()
+    return thread
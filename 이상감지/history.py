@@ -0,0 +1,145 @@
+import contextlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('nufarm')
+
+# 집계 단위별 구간 길이 (초)
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS detections (
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    model TEXT NOT NULL,
+    counts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detections_lookup ON detections (camera, model, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    model TEXT NOT NULL,
+    class TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    max INTEGER NOT NULL,
+    PRIMARY KEY (resolution, camera, model, class, bucket)
+);
+'''
+
+UPSERT_ROLLUP = '''
+INSERT INTO rollups (resolution, bucket, camera, model, class, samples, total, max)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, camera, model, class, bucket) DO UPDATE SET
+    samples = samples + excluded.samples,
+    total = total + excluded.total,
+    max = MAX(max, excluded.max)
+'''
+
+
+# 구간 시작 시각 (일 단위는 UTC가 아닌 현지 자정 기준)
+def bucket_start(ts, seconds):
+    offset = -time.timezone
+    return int((ts + offset) // seconds * seconds - offset)
+
+
+# 감지 결과(카메라별, 모델별 클래스 개수)를 SQLite(WAL)에 쌓아두는 기록 저장소
+# 추론 스레드는 큐에 넣기만 하고, 쓰기 스레드가 모아서 한 번의 트랜잭션으로 저장
+# 분/시/일 단위 집계는 저장할 때 같이 갱신해서 긴 기간을 조회해도 원본 행을 훑지 않음
+class DetectionHistory:
+    def __init__(self, path='./history.db', flush_interval=5.0, raw_retention_days=7, max_pending=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.raw_retention = raw_retention_days * 86400  # 원본 행 보관 기간 (집계는 계속 보관)
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0  # 쓰기가 밀려서 버린 결과 수
+
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+        thread = threading.Thread(target=self._write_loop)
+        thread.daemon = True
+        thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    # counts: {클래스 이름: 개수}, 큐가 가득 차면 기다리지 않고 버림
+    def record(self, camera_id, model, counts, ts=None):
+        try:
+            self.pending.put_nowait((time.time() if ts is None else ts, camera_id, model, counts))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        conn = self._connect()
+        last_cleanup = 0
+        while True:
+            time.sleep(self.flush_interval)
+            batch = []
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(conn, batch)
+                except sqlite3.Error as e:
+                    logger.error('Writing detection history failed', extra={'fields': {'error': str(e)}})
+
+            # 오래된 원본 행은 한 시간마다 삭제
+            if time.time() - last_cleanup > 3600:
+                last_cleanup = time.time()
+                try:
+                    with conn:
+                        conn.execute('DELETE FROM detections WHERE ts < ?', (last_cleanup - self.raw_retention,))
+                except sqlite3.Error as e:
+                    logger.error('Deleting old detection history failed', extra={'fields': {'error': str(e)}})
+
+    def _write(self, conn, batch):
+        # 같은 구간의 결과는 메모리에서 먼저 합쳐서 집계 테이블 갱신 횟수를 줄임
+        rollups = {}
+        for ts, camera_id, model, counts in batch:
+            for resolution, seconds in RESOLUTIONS.items():
+                bucket = bucket_start(ts, seconds)
+                for name, count in counts.items():
+                    key = (resolution, bucket, camera_id, model, name)
+                    samples, total, maximum = rollups.get(key, (0, 0, 0))
+                    rollups[key] = (samples + 1, total + count, max(maximum, count))
+
+        with conn:
+            conn.executemany('INSERT INTO detections (ts, camera, model, counts) VALUES (?, ?, ?, ?)',
+                             [(ts, camera_id, model, json.dumps(counts)) for ts, camera_id, model, counts in batch])
+            conn.executemany(UPSERT_ROLLUP, [key + value for key, value in rollups.items()])
+
+    # 기간 내 원본 결과 (최근 보관 기간만 있음)
+    def query(self, camera_id, model, start, end, limit=1000):
+        # sqlite3 연결의 with는 트랜잭션만 끝내고 연결은 닫지 않으므로 closing으로 닫음
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute('SELECT ts, counts FROM detections WHERE camera = ? AND model = ? AND ts >= ? AND ts < ? '
+                                'ORDER BY ts LIMIT ?', (camera_id, model, start, end, limit)).fetchall()
+        return [{'timestamp': ts, 'counts': json.loads(counts)} for ts, counts in rows]
+
+    # 분/시/일 단위 집계 (구간별 클래스 개수의 평균과 최댓값)
+    def aggregate(self, camera_id, model, resolution, start, end):
+        seconds = RESOLUTIONS[resolution]
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute('SELECT bucket, class, samples, total, max FROM rollups '
+                                'WHERE resolution = ? AND camera = ? AND model = ? AND bucket >= ? AND bucket < ? '
+                                'ORDER BY bucket', (resolution, camera_id, model, bucket_start(start, seconds), end)).fetchall()
+
+        buckets = {}
+        for bucket, name, samples, total, maximum in rows:
+            entry = buckets.setdefault(bucket, {'timestamp': bucket, 'samples': samples, 'classes': {}})
+            entry['classes'][name] = {'avg': total / samples, 'max': maximum}
+        return list(buckets.values())
@@ -1,31 +1,72 @@
 from flask import Flask, jsonify, render_template, Response, request
-import cv2
 import threading
 import os
 import time
-from ultralytics import YOLO
+import functools
+import hmac
+import logging
 from flask_cors import CORS
-import requests
 from flasgger import Swagger
 from datetime import datetime
+from publisher import ImagePublisher
+from cameras import CameraRegistry, WorkerPool
+from backends import load_model
+from process_workers import TensorSlots, ProcessModel
+from config import load_config
+from postprocess import extract_detections, count_classes, draw_detections
+from status_state import StatusState
+from events import EventBroadcaster, sse_stream
+from history import DetectionHistory, RESOLUTIONS
+from notifier import NotificationDispatcher
+from pacing import PacingController
+from profiles import ModelProfile
+from tiling import Tiler
+from tracker import Tracker
+import metrics
 
 
 app = Flask(__name__)
 CORS(app)
 swagger = Swagger(app)
 
-model1 = YOLO('abnormal.pt')
-model2 = YOLO('growth.pt')
+# 설정 파일 (config.json) 로드
+config = load_config()
 
-# 웹캠 인덱스
-camera = cv2.VideoCapture(2)
+# 한 줄에 하나의 JSON으로 출력하는 로그
+logger = metrics.setup_logging(config['log_level'])
+
+# abnormal 모델의 타일 추론 설정 (켜져 있으면 프레임마다 grid 개수만큼 타일을 추론)
+tiling_config = config['models']['abnormal']['tiling']
+tiler = Tiler(tiling_config['grid'], tiling_config['overlap'], tiling_config['roi'], tiling_config['iou']) if tiling_config['enabled'] else None
+
+# 설정된 백엔드(onnx / openvino / onnx-int8 / pytorch)로 모델 로드
+# processes 모드에서는 모델마다 워커 프로세스에서 로드하고 이 프로세스는 감지 결과만 받아서 HTTP 응답을 처리
+# threads 모드에서는 추론 워커마다 모델을 따로 로드해서 워커끼리 동시에 추론 (모델 메모리는 워커 수만큼 늘어남)
+if config['execution'] == 'processes':
+    # 워커 프로세스는 카메라와 추론 스레드가 시작되기 전에 만들어야 함
+    # 슬롯 크기: 최대 배치(4장, 타일 추론이면 4장 x 타일 수) x RGB x 입력 크기 x 입력 크기 x float32
+    max_images = 4 * (tiler.grid[0] * tiler.grid[1] if tiler is not None else 1)
+    shared_slots = TensorSlots(config['shared_slots'], max_images * 3 * config['imgsz'] * config['imgsz'] * 4)
+    process_models = {name: ProcessModel(config['models'][name]['weights'], config['models'][name]['backend'], config['imgsz'], config['calibration_dir'], shared_slots)
+                      for name in ('abnormal', 'growth')}
 
-# 이미지 저장 경로
-img_path1 = './static/captured_image_model1.jpg'
-img_path2 = './static/captured_image_model2.jpg'
 
-# 파일 접근을 보호하기 위한 Lock 생성
-lock = threading.Lock()
+# 워커마다 호출해서 모델을 만듦 (processes 모드는 모델 프로세스 하나를 모든 워커가 공유, 요청은 프로세스가 차례로 처리)
+def make_model(name):
+    if config['execution'] == 'processes':
+        return process_models[name]
+    return load_model(config['models'][name]['weights'], config['models'][name]['backend'], config['imgsz'], config['calibration_dir'])
+
+
+# 모델별 실행 프로필 (입력 크기, 감지 기준, 최소 실행 간격, 실행 시간대), /admin/profiles로 실행 중에 변경
+profiles = {name: ModelProfile(**config['models'][name]['profile'], min_imgsz=config['min_imgsz'], max_imgsz=config['imgsz'])
+            for name in ('abnormal', 'growth')}
+
+# 카메라 목록 (설정 파일의 cameras: 카메라 ID -> 웹캠 인덱스 / 동영상 파일 / RTSP 주소)
+# 카메라마다 캡처 스레드가 디코딩한 프레임을 모든 모델이 공유
+registry = CameraRegistry(config['cameras'])
+camera_ids = registry.ids()
+default_camera = camera_ids[0]  # camera 파라미터가 없는 요청은 첫 번째 카메라로 처리
 
 # 클래스 이름과 색상 정의 (각 모델에 대해)
 class_names_model1 = {
@@ -49,183 +90,397 @@ class_colors_model2 = {
     2: (255, 0, 255),
 }
 
-
-status = False # 감지 상태 저장
-freeze_status = False # 상태 정보 고정
-status_lock = threading.Lock() # 동시 접근 제어를 위한 lock
+# 이미지 저장 경로
+img_path1 = './static/captured_image_model1.jpg'
+img_path2 = './static/captured_image_model2.jpg'
 
 
-# # 백엔드로 이상감지 정보 전달
-# def send_notification(detected_counts):
-#     url = "http://3.34.153.235:8080/api/notification/save"
-#     params = {
-#         'userId': 1,
-#         'hole': detected_counts.get('hole', 0),
-#         'wither': detected_counts.get('wither', 0),
-#         'timestamp': datetime.now().isoformat()  # 현재 시간을 ISO 형식으로 추가
-#     }
+# 카메라별 이미지 저장 경로 (기본 카메라는 기존 파일 이름 그대로 사용)
+def image_path(path, camera_id):
+    if camera_id == default_camera:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}_{camera_id}{ext}'
+
+
+# 이미지 요청이 있을 때만 감지 결과를 프레임 복사본에 그림
+def render_detections(class_names, class_colors):
+    return lambda frame, detections: draw_detections(frame.copy(), detections, class_names, class_colors)
+
+# 카메라별, 모델별 최신 프레임과 감지 결과 (이미지는 요청이 올 때 그려서 JPEG로 인코딩)
+publishers1 = {camera_id: ImagePublisher(render_detections(class_names_model1, class_colors_model1),
+                                         image_path(img_path1, camera_id) if config['save_images'] else None)
+               for camera_id in camera_ids}
+publishers2 = {camera_id: ImagePublisher(render_detections(class_names_model2, class_colors_model2),
+                                         image_path(img_path2, camera_id) if config['save_images'] else None)
+               for camera_id in camera_ids}
+
+# 동시에 열 수 있는 MJPEG 스트림 개수 제한
+max_streams = 8
+stream_slots = threading.BoundedSemaphore(max_streams)
+
+
+# 카메라별 감지 상태 저장 (reset 후 클래스별로 설정된 시간 동안 False로 고정)
+status_states = {camera_id: StatusState(config['status_suppression']) for camera_id in camera_ids}
+
+# 카메라별, 모델별 감지 결과 기록 (백그라운드 스레드에서 모아서 저장)
+history = DetectionHistory(config['history']['path'], config['history']['flush_interval'],
+                           config['history']['raw_retention_days'])
+
+# status, class_counts가 바뀔 때만 구독자들에게 보내는 이벤트 채널 (/events)
+broadcaster = EventBroadcaster()
+max_event_streams = 64
+event_slots = threading.BoundedSemaphore(max_event_streams)
+
+
+# 백엔드로 이상감지 정보 전달 (백그라운드에서 전송하므로 추론 스레드는 기다리지 않음)
+notification_config = config['notification']
+notifier = NotificationDispatcher(notification_config['url'], notification_config['user_id'],
+                                  notification_config['window'], notification_config['timeout'],
+                                  notification_config['max_retries'],
+                                  spill_path=notification_config['spill_path']) if notification_config['enabled'] else None
+
+# 카메라별 클래스별 박스 개수
+class_counts = {camera_id: {0: 0, 1: 0} for camera_id in camera_ids}
+
+# 카메라별 이상 객체 추적기 (켜져 있으면 개수와 알림을 고유 트랙 기준으로 계산)
+tracking_config = config['models']['abnormal']['tracking']
+trackers = {camera_id: Tracker(tracking_config['iou'], tracking_config['high_conf'], tracking_config['min_hits'],
+                               tracking_config['max_age'])
+            for camera_id in camera_ids} if tracking_config['enabled'] else None
+last_results = {}  # 카메라별 마지막으로 받은 추론 결과 (추론하지 않은 프레임에는 같은 결과가 다시 전달됨)
+
+# 클래스별 감지 개수 지표 (/metrics)
+def count_detections(camera_id, model, detected_counts):
+    for name, count in detected_counts.items():
+        if count:
+            metrics.detections_total.inc(count, camera=camera_id, model=model, **{'class': name})
+
+# model1 결과 후처리 (스케줄러가 추론 결과를 넘겨줌)
+def abnormal(camera_id, frame, results, unchanged, class_names):
+    # 감지된 객체 처리 (박스 정보는 프레임당 한 번에 NumPy로 가져와서 클래스별 개수를 계산)
+    detections = extract_detections(results)
+    new_tracks = None
+    if trackers is not None:
+        # 새 추론 결과면 트랙을 갱신하고, 같은 결과가 다시 들어온 경우(추론하지 않은 프레임)는 위치만 예측
+        # 장면 변화가 없어서 다시 들어온 결과는 마지막 감지에서 연결된 트랙이 계속 보이는 것으로 처리 (max_age가 지나도 유지)
+        # 개수와 이미지는 확정된 트랙 기준 (같은 구멍이 여러 프레임에 보여도 한 개)
+        fresh = results is not last_results.get(camera_id)
+        last_results[camera_id] = results
+        new_tracks = trackers[camera_id].update(detections if fresh else None, unchanged=unchanged and not fresh)
+        detections = trackers[camera_id].detections()
+
+    counts = count_classes(detections.cls, len(class_names))
+    detected_counts = {name: int(counts[label_id]) for label_id, name in class_names.items()}
+    class_counts[camera_id] = {label_id: int(counts[label_id]) for label_id in class_names}
+
+    # 감지된 객체가 있으면 상태를 True로 변경 (reset 후 고정 시간 중인 클래스는 무시)
+    status = status_states[camera_id].update(detected_counts)
+    # 이상 감지가 발생한 경우 백엔드로 알림 전송 (추적 중이면 새 객체가 확정될 때만)
+    if status and notifier is not None and (new_tracks is None or new_tracks):
+        notifier.notify(camera_id, detected_counts)
+    if trackers is not None:
+        broadcaster.publish(('tracks', camera_id), trackers[camera_id].state(class_names))
+
+    # 이전과 달라진 경우에만 구독자들에게 전송
+    broadcaster.publish(('class_counts', camera_id), detected_counts)
+    if broadcaster.publish(('status', camera_id), {'status': status}):
+        logger.info('Status changed', extra={'fields': {'camera': camera_id, 'status': status, 'counts': detected_counts}})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Detections', extra={'fields': {'camera': camera_id, 'status': status, 'counts': detected_counts}})
+    history.record(camera_id, 'abnormal', detected_counts)
+    count_detections(camera_id, 'abnormal', detected_counts)
+
+    # 원본 프레임과 감지 결과만 저장 (박스 그리기와 인코딩은 이미지 요청이 있을 때만 수행)
+    publishers1[camera_id].publish(frame, detections)
+
+
+# model2 결과 후처리 (스케줄러가 추론 결과를 넘겨줌)
+def growth(camera_id, frame, results, unchanged):
+    detections = extract_detections(results)
+    counts = count_classes(detections.cls, len(class_names_model2))
+    detected_counts = {name: int(counts[label_id]) for label_id, name in class_names_model2.items()}
+    history.record(camera_id, 'growth', detected_counts)
+    count_detections(camera_id, 'growth', detected_counts)
+
+    # 원본 프레임과 감지 결과만 저장 (박스 그리기와 인코딩은 이미지 요청이 있을 때만 수행)
+    publishers2[camera_id].publish(frame, detections)
+
+# 카메라별 캡처 스레드 시작 (장치 접근은 캡처 스레드만 수행)
+registry.start()
+
+# 추론 워커 생성 (카메라들을 워커에 나눠 배정하고, 워커마다 프레임 전처리는 한 번만 해서 두 모델을 연달아 실행)
+workers = WorkerPool(registry, config['workers'])
+
+
+# 모델별 실행 속도 조절 (목표 FPS와 CPU 예산에 맞춰 대기 시간과 입력 크기를 정함, 입력 크기는 프로필 크기부터)
+def make_pacer(name):
+    return PacingController(config['models'][name]['target_fps'], config['models'][name]['cpu_budget'],
+                            profiles[name].sizes())
+
+# model1에 대한 감지
+workers.add_model('abnormal', lambda: make_model('abnormal'), lambda source, frame, results, unchanged: abnormal(source, frame, results, unchanged, class_names_model1),
+                  lambda: make_pacer('abnormal'),
+                  config['models']['abnormal']['change_threshold'], config['models']['abnormal']['max_staleness'], tiler,
+                  tracking_config['detect_every'] if trackers is not None else 1, profiles['abnormal'])
+
+# model2에 대한 감지
+workers.add_model('growth', lambda: make_model('growth'), growth,
+                  lambda: make_pacer('growth'),
+                  config['models']['growth']['change_threshold'], config['models']['growth']['max_staleness'],
+                  profile=profiles['growth'])
+
+workers.start()
+
+
+# 모델별 건너뛴 프레임 수 등 요청 시점에 계산하는 지표 (추론한 프레임 수는 스케줄러가 직접 셈)
+def collect_metrics():
+    stats = workers.stats()
+    return [
+        ('nufarm_frames_skipped_total', 'counter', 'Frames skipped because the scene did not change',
+         [({'model': name}, model_stats['skipped']) for name, model_stats in stats.items()]),
+        ('nufarm_event_subscribers', 'gauge', 'Connected /events subscribers', [({}, broadcaster.subscribers)]),
+        ('nufarm_history_dropped_total', 'counter', 'Results not written to the history store', [({}, history.dropped)]),
+    ]
+
+metrics.collectors.append(collect_metrics)
+
+
+# 엔드포인트별 응답 시간 (스트림은 첫 응답까지의 시간)
+@app.before_request
+def start_timer():
+    request.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.request_seconds.observe(time.perf_counter() - request.start_time,
+                                    endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+# Prometheus 지표
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# 요청의 camera 파라미터로 카메라를 선택해서 view 함수에 camera_id로 넘겨줌 (없으면 기본 카메라)
+def with_camera(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        camera_id = request.args.get('camera', default_camera)
+        if camera_id not in registry.cameras:
+            return jsonify({'status': 'error', 'message': f'Unknown camera {camera_id}.'}), 404
+        return view(camera_id, *args, **kwargs)
+    return wrapper
 
-#     print(f"Sending GET request to {url} with params: {params}")
+@app.route('/model1')
+def index_model1():
+    return render_template('index.html', default_camera=default_camera)
 
-#     try:
-#         response = requests.get(url, params=params)
-#         if response.status_code == 200:
-#             print("Notification sent successfully.")
-#         else:
-#             print(f"Failed to send notification: {response.status_code} - {response.text}")
-#     except Exception as e:
-#         print(f"Error sending notification: {e}")
+@app.route('/model2')
+def index_model2():
+    return render_template('index.html', default_camera=default_camera)
 
-class_counts = {0: 0, 1: 0}
+@app.route('/image_model1', methods=['GET'])
+@with_camera
+def get_image_model1(camera_id):
+    snapshot = publishers1[camera_id].latest()
+    if snapshot is not None:
+        return Response(snapshot[2], mimetype='image/jpeg')
+    else:
+        return jsonify({'status': 'error', 'message': 'No image available for model1.'})
 
-def abnormal(model, img_path, class_names, class_colors, sleep_time):
-    global status, freeze_status, class_counts
-    while True:
-        with lock:
-            camera.grab()
-            ret, frame = camera.retrieve()
-            
-
-        if ret:
-            results = model(frame)
-            detected_counts = {name: 0 for name in class_names.values()}
-            class_counts = {0: 0, 1: 0}
-
-            # 감지된 객체 처리
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    label_id = int(box.cls)
-                    color = class_colors.get(label_id, (255, 255, 255))
-                    label = class_names.get(label_id, 'Unknown')
-
-                    # 감지된 클래스별 개수 증가
-                    if label in detected_counts:
-                        detected_counts[label] += 1
-                        class_counts[label_id] += 1
-
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f'{label}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-            # freeze_status True일 때 일정 시간 동안 상태를 변경하지 않음
-            if freeze_status:
-                # print("freeze_status is active, not changing status.")
-                time.sleep(100)  # 100초간 상태 고정
-                freeze_status = False
-
-            # 감지된 객체가 있는 경우 상태를 True로 변경
-            elif any(count > 0 for count in detected_counts.values()):
-                with status_lock:
-                    status = True
-                    # send_notification(detected_counts)  # 이상 감지가 발생한 경우 백엔드로 알림 전송
-
-            # 감지된 객체가 없는 경우 상태를 False로 유지
-            else:
-                with status_lock:
-                    status = False
-
-            # 로그로 상태 출력
-            print(f'Status: {status}, Counts: {detected_counts}')
-
-            with lock:
-                cv2.imwrite(img_path, frame)
-
-        time.sleep(sleep_time)
-
-
-def growth(model, img_path, class_names, class_colors, sleep_time):
-    global status, freeze_status, class_counts
+@app.route('/image_model2', methods=['GET'])
+@with_camera
+def get_image_model2(camera_id):
+    snapshot = publishers2[camera_id].latest()
+    if snapshot is not None:
+        return Response(snapshot[2], mimetype='image/jpeg')
+    else:
+        return jsonify({'status': 'error', 'message': 'No image available for model2.'})
+
+# 새 이미지가 발행될 때만 프레임을 전송하는 MJPEG 스트림
+# 클라이언트가 느리면 밀린 프레임은 건너뛰고 항상 최신 프레임만 보냄
+def mjpeg_stream(publisher, keepalive=10):
+    last_version = 0
+    snapshot = publisher.latest()
     while True:
-        with lock:
-            camera.grab()
-            ret, frame = camera.retrieve()
-            
-
-        if ret:
-            results = model(frame)
+        newer = publisher.wait_newer(last_version, timeout=keepalive)
+        if newer is None:
+            # 새 이미지가 없으면 마지막 이미지를 다시 보내서 연결 끊김을 확인
+            if snapshot is None:
+                continue
+        else:
+            snapshot = newer
+            last_version = snapshot[0]
 
-            # 감지된 객체 처리
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    label_id = int(box.cls)
-                    color = class_colors.get(label_id, (255, 255, 255))
-                    label = class_names.get(label_id, 'Unknown')
+        data = snapshot[2]
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n'
+               b'Content-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n')
 
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f'{label}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
 
-            with lock:
-                cv2.imwrite(img_path, frame)
+def stream_response(publisher):
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({'status': 'error', 'message': 'Too many streams.'}), 503
 
-        time.sleep(sleep_time)
+    response = Response(mjpeg_stream(publisher), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.call_on_close(stream_slots.release)
+    return response
 
-# 스레드 생성 (model1에 대한 감지, 나중에 2 >> 0.1로 바꾸기)
-thread1 = threading.Thread(target=abnormal, args=(model1, img_path1, class_names_model1, class_colors_model1, 2))
-thread1.daemon = True
-thread1.start()
+@app.route('/stream_model1', methods=['GET'])
+@with_camera
+def stream_model1(camera_id):
+    return stream_response(publishers1[camera_id])
 
-# 스레드 생성 (model2에 대한 감지, 나중에 3 >> 0.1로 바꾸기)
-thread2 = threading.Thread(target=growth, args=(model2, img_path2, class_names_model2, class_colors_model2, 3))
-thread2.daemon = True
-thread2.start()
+@app.route('/stream_model2', methods=['GET'])
+@with_camera
+def stream_model2(camera_id):
+    return stream_response(publishers2[camera_id])
 
-@app.route('/model1')
-def index_model1():
-    return render_template('index.html')
-
-@app.route('/model2')
-def index_model2():
-    return render_template('index.html')
+# 모델별 추론 횟수, 장면 변화가 없어서 건너뛴 횟수 (변화 감지 threshold 조정용), 워커별 현재 FPS와 입력 크기
+@app.route('/inference_stats', methods=['GET'])
+def get_inference_stats():
+    return jsonify(workers.stats())
 
-@app.route('/image_model1', methods=['GET'])
-def get_image_model1():
-    with lock:
-        if os.path.exists(img_path1):
-            with open(img_path1, 'rb') as f:
-                image_data = f.read()
-            return Response(image_data, mimetype='image/jpeg')
-        else:
-            return jsonify({'status': 'error', 'message': 'No image available for model1.'})
-
-@app.route('/image_model2', methods=['GET'])
-def get_image_model2():
-    with lock:
-        if os.path.exists(img_path2):
-            with open(img_path2, 'rb') as f:
-                image_data = f.read()
-            return Response(image_data, mimetype='image/jpeg')
-        else:
-            return jsonify({'status': 'error', 'message': 'No image available for model2.'})
+# 등록된 카메라 목록
+@app.route('/cameras', methods=['GET'])
+def get_cameras():
+    return jsonify({
+        'default': default_camera,
+        'cameras': {camera_id: str(camera['source']) for camera_id, camera in registry.cameras.items()}
+    })
 
 # 1) 유림 >> 건우 : model1에서 감지된 박스가 있을 때 status를 true로 보내는 API
 @app.route('/status', methods=['GET'])
-def get_status():
-    return jsonify({'status': status})
+@with_camera
+def get_status(camera_id):
+    return jsonify({'status': status_states[camera_id].status})
 
 
 
 # 2) 건우 >> 유림 : 버튼 클릭 시 status를 false로 바꾸는 API
 @app.route('/reset_status', methods=['POST'])
-def reset_status():
-    global status, freeze_status
-    with status_lock:
-        status = False
-        freeze_status = True  # 100초간 false로 고정
-    print(f'Status = {status}')
-    return jsonify({'status': status})
+@with_camera
+def reset_status(camera_id):
+    status = status_states[camera_id].suppress()  # 클래스별 설정 시간 동안 false로 고정
+    logger.info('Status reset', extra={'fields': {'camera': camera_id, 'status': status}})
+    broadcaster.publish(('status', camera_id), {'status': status})
+    return jsonify({'status': status, 'suppressed_for': status_states[camera_id].remaining()})
 
 # 3) 유림 >> 건우 : 클래스별 박스 개수를 반환하는 API
 @app.route('/get_class_counts', methods=['GET'])
-def get_class_counts():
-    global class_counts  # 전역 변수 사용
+@with_camera
+def get_class_counts(camera_id):
     # 클래스 개수를 JSON 형식으로 반환
+    counts = class_counts[camera_id]
     return jsonify({
-        'hole': class_counts[0],
-        'wither': class_counts[1]
+        'hole': counts[0],
+        'wither': counts[1]
     })
 
+# 추적 중인 객체 ID와 클래스별 고유 개수 (추적이 꺼져 있으면 404)
+@app.route('/tracks', methods=['GET'])
+@with_camera
+def get_tracks(camera_id):
+    if trackers is None:
+        return jsonify({'status': 'error', 'message': 'Tracking is disabled.'}), 404
+    return jsonify(trackers[camera_id].state(class_names_model1))
+
+# 4) status, class_counts, tracks가 바뀔 때만 보내는 SSE 스트림 (폴링 대신 사용)
+# camera 파라미터가 있으면 해당 카메라 이벤트만, 없으면 모든 카메라 이벤트를 보냄
+@app.route('/events', methods=['GET'])
+def events():
+    camera_id = request.args.get('camera')
+    if camera_id is not None and camera_id not in registry.cameras:
+        return jsonify({'status': 'error', 'message': f'Unknown camera {camera_id}.'}), 404
+    if not event_slots.acquire(blocking=False):
+        return jsonify({'status': 'error', 'message': 'Too many event streams.'}), 503
+
+    # 재연결한 브라우저는 마지막으로 받은 이벤트 다음부터 받음
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_version = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    response = Response(sse_stream(broadcaster, camera_id, last_version), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(event_slots.release)
+    return response
+
+# 조회 기간 파라미터 (유닉스 시간 또는 ISO 형식, 없으면 최근 하루)
+def time_range():
+    def parse(value, default):
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
+
+    end = parse(request.args.get('end'), time.time())
+    start = parse(request.args.get('start'), end - 86400)
+    return start, end
+
+# 5) 기간 내 감지 결과 기록 (model: abnormal / growth)
+@app.route('/history', methods=['GET'])
+@with_camera
+def get_history(camera_id):
+    model = request.args.get('model', 'abnormal')
+    try:
+        start, end = time_range()
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid start or end.'}), 400
+    limit = request.args.get('limit', 1000, type=int)
+    return jsonify(history.query(camera_id, model, start, end, limit))
+
+# 6) 분/시/일 단위 클래스별 평균, 최대 개수 (resolution: minute / hour / day)
+@app.route('/history/aggregate', methods=['GET'])
+@with_camera
+def get_history_aggregate(camera_id):
+    model = request.args.get('model', 'abnormal')
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in RESOLUTIONS:
+        return jsonify({'status': 'error', 'message': f'Unknown resolution {resolution}.'}), 400
+    try:
+        start, end = time_range()
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid start or end.'}), 400
+    return jsonify(history.aggregate(camera_id, model, resolution, start, end))
+
+# 설정 파일에 admin_token이 있으면 X-Admin-Token 헤더가 같은 요청만 허용
+# admin_token이 없으면 서버가 실행 중인 기기(localhost)에서 온 요청만 허용 (서버는 0.0.0.0에서 CORS를 열고 실행됨)
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if config['admin_token'] is None:
+            if request.remote_addr not in ('127.0.0.1', '::1'):
+                return jsonify({'status': 'error', 'message': 'Admin API is only available from localhost without admin_token.'}), 403
+        elif not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), config['admin_token']):
+            return jsonify({'status': 'error', 'message': 'Invalid admin token.'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# 7) 모델별 실행 프로필 조회
+@app.route('/admin/profiles', methods=['GET'])
+@admin_only
+def get_profiles():
+    return jsonify({name: profile.to_dict() for name, profile in profiles.items()})
+
+# 8) 모델별 실행 프로필 변경 (바꿀 항목만 JSON으로 전송, 예: {"imgsz": 480, "windows": [["06:00", "19:00"]]})
+# 다음 실행부터 적용되고 서버를 다시 시작하면 설정 파일 값으로 돌아감
+@app.route('/admin/profiles/<name>', methods=['PUT', 'POST'])
+@admin_only
+def update_profile(name):
+    if name not in profiles:
+        return jsonify({'status': 'error', 'message': f'Unknown model {name}.'}), 404
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON object.'}), 400
+    try:
+        profiles[name].update(changes)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    logger.info('profile updated', extra={'fields': {'model': name, **changes}})
+    return jsonify(profiles[name].to_dict())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
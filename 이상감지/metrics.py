@@ -0,0 +1,152 @@
+import bisect
+import json
+import logging
+import threading
+import time
+
+# 운영 중에도 계속 켜둘 수 있는 가벼운 Prometheus 지표 (/metrics에서 텍스트 형식으로 제공)
+# 값 갱신은 짧은 lock 안에서 숫자만 더하고, 문자열 변환은 /metrics 요청이 올 때만 수행
+
+registry = []
+collectors = []  # 요청 시점에 값을 계산하는 함수들 (반환값: [(이름, 타입, 설명, [(labels dict, 값)])])
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (10000, 25000, 50000, 100000, 200000, 400000, 800000)
+
+
+# 라벨 값의 \, ", 줄바꿈은 Prometheus 텍스트 형식에 맞게 이스케이프
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self.lock:
+            values = list(self.values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # label 값 -> [구간별 개수..., +Inf 개수], 합계
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self.values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(self.labels, key, ("le", bound))} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    for collect in collectors:
+        for name, kind, description, samples in collect():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{format_labels(list(labels), list(labels.values()))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# 여러 모듈에서 같이 쓰는 지표
+frames_grabbed = Counter('nufarm_frames_grabbed_total', 'Frames grabbed from the camera', ('camera',))
+frames_captured = Counter('nufarm_frames_captured_total', 'Frames decoded into the frame ring', ('camera',))
+frames_inferred = Counter('nufarm_frames_inferred_total', 'Frames run through each model', ('model',))
+results_dropped = Counter('nufarm_results_dropped_total', 'Results dropped because post-processing fell behind', ('model',))
+inference_seconds = Histogram('nufarm_inference_seconds', 'Inference latency per batch', ('model',))
+lock_wait_seconds = Histogram('nufarm_lock_wait_seconds', 'Time spent waiting to acquire a lock', ('lock',),
+                              (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0))
+jpeg_encode_seconds = Histogram('nufarm_jpeg_encode_seconds', 'JPEG encode time')
+jpeg_size_bytes = Histogram('nufarm_jpeg_size_bytes', 'Encoded JPEG size', buckets=SIZE_BUCKETS)
+request_seconds = Histogram('nufarm_http_request_seconds', 'HTTP request latency (time to first byte for streams)',
+                            ('endpoint', 'method', 'status'))
+detections_total = Counter('nufarm_detections_total', 'Detected boxes per class', ('camera', 'model', 'class'))
+
+
+# lock을 얻을 때까지 기다린 시간을 기록하면서 lock을 잡음
+class TimedLock:
+    def __init__(self, lock, name):
+        self.lock = lock
+        self.name = name
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        lock_wait_seconds.observe(time.perf_counter() - start, lock=self.name)
+        return self.lock
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+# 한 줄에 하나의 JSON으로 출력하는 로그 형식 (extra={'fields': {...}}로 준 값을 같이 출력)
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level='INFO'):
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger('nufarm')
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
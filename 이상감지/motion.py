@@ -0,0 +1,42 @@
+import time
+
+import cv2
+import numpy as np
+
+
+# 마지막으로 추론한 프레임과 비교해서 장면이 바뀌었는지 판단하는 간단한 변화 감지기
+# 작게 줄인 흑백 이미지를 cell x cell 칸으로 나누고, 가장 많이 바뀐 칸의 평균 밝기 차이가 threshold 이하면 추론을 건너뜀
+# (전체 평균을 쓰면 잎에 새로 생긴 작은 구멍 같은 국소적인 변화가 묻혀 버림)
+class ChangeDetector:
+    def __init__(self, threshold=4.0, max_staleness=60.0, size=(128, 96), cell=8):
+        self.threshold = threshold
+        self.max_staleness = max_staleness  # 이 시간(초)이 지나면 변화가 없어도 다시 추론
+        self.size = size  # cell의 배수
+        self.cell = cell
+        self.reference = None
+        self.reference_time = 0
+
+    def signature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def difference(self, signature):
+        w, h = self.size
+        diff = np.abs(signature - self.reference)
+        cells = diff.reshape(h // self.cell, self.cell, w // self.cell, self.cell).mean(axis=(1, 3))
+        return float(cells.max())
+
+    # 추론이 필요하면 True (이때 현재 프레임을 새 기준 프레임으로 저장)
+    def should_infer(self, frame, now=None):
+        now = time.time() if now is None else now
+        signature = self.signature(frame)
+
+        if (self.reference is None
+                or now - self.reference_time >= self.max_staleness
+                or self.difference(signature) > self.threshold):
+            self.reference = signature
+            self.reference_time = now
+            return True
+
+        return False
+
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+logger = logging.getLogger('nufarm')
+
+
+# 이상 감지 알림을 백엔드로 보내는 백그라운드 전송기
+# 추론 스레드는 큐에 넣기만 하고 기다리지 않음 (큐가 가득 차면 버림)
+# window초 동안 들어온 같은 카메라의 알림은 클래스별 최대 개수로 합쳐서 한 번만 전송
+# 전송에 실패하면 간격을 늘려가며 다시 시도하고, 그래도 실패하면 디스크에 저장했다가 나중에 다시 보냄
+# 백엔드가 요청 자체를 거부한 경우(408, 429를 제외한 4xx)는 다시 보내도 같은 결과이므로 기록만 하고 버림
+class NotificationDispatcher:
+    def __init__(self, url, user_id=1, window=10.0, timeout=5.0, max_retries=3, backoff=1.0,
+                 spill_path='./notification_spill.jsonl', max_pending=1000):
+        self.url = url
+        self.user_id = user_id
+        self.window = window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spill_path = spill_path
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.session = requests.Session()  # 연결을 재사용
+        self.stats = {'queued': 0, 'dropped': 0, 'sent': 0, 'failed': 0, 'rejected': 0, 'spilled': 0}
+        self.spill_lock = threading.Lock()
+
+        thread = threading.Thread(target=self._dispatch_loop)
+        thread.daemon = True
+        thread.start()
+
+    def notify(self, camera_id, detected_counts):
+        try:
+            self.pending.put_nowait((camera_id, dict(detected_counts), datetime.now().isoformat()))
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                first = self.pending.get(timeout=self.window)
+            except queue.Empty:
+                self._resend_spilled()
+                continue
+
+            # window 동안 들어온 알림을 카메라별로 합침 (처음 감지된 시각을 사용)
+            merged = {}
+            item = first
+            deadline = time.time() + self.window
+            while True:
+                camera_id, counts, timestamp = item
+                if camera_id in merged:
+                    merged_counts = merged[camera_id]['counts']
+                    for name, count in counts.items():
+                        merged_counts[name] = max(merged_counts.get(name, 0), count)
+                else:
+                    merged[camera_id] = {'counts': counts, 'timestamp': timestamp}
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            for camera_id, notification in merged.items():
+                params = self.params(notification['counts'], notification['timestamp'])
+                result = self._send(params)
+                if result == 'sent':
+                    self._resend_spilled()
+                elif result == 'failed':
+                    self._spill(params)
+
+    def params(self, counts, timestamp):
+        return {
+            'userId': self.user_id,
+            'hole': counts.get('hole', 0),
+            'wither': counts.get('wither', 0),
+            'timestamp': timestamp,
+        }
+
+    # 한 번 전송하고 결과를 반환: 'sent', 'rejected' (다시 보내지 않음), 'failed' (나중에 다시 보냄)
+    def _request(self, params):
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning('Sending notification failed', extra={'fields': {'error': str(e)}})
+            return 'failed'
+        if response.status_code == 200:
+            self.stats['sent'] += 1
+            return 'sent'
+        logger.warning('Sending notification failed', extra={'fields': {'status': response.status_code,
+                                                                        'response': response.text[:200]}})
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            logger.error('Notification rejected, dropping it', extra={'fields': {'params': params}})
+            self.stats['rejected'] += 1
+            return 'rejected'
+        return 'failed'
+
+    def _send(self, params):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            result = self._request(params)
+            if result != 'failed':
+                return result
+
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay *= 2
+        self.stats['failed'] += 1
+        return 'failed'
+
+    def _spill(self, params):
+        if not self.spill_path:
+            return
+        with self.spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(params) + '\n')
+            self.stats['spilled'] += 1
+
+    # 디스크에 저장된 알림을 순서대로 다시 보냄 (거부된 알림은 버리고, 실패하면 남은 알림은 그대로 둠)
+    def _resend_spilled(self):
+        if not self.spill_path:
+            return
+        with self.spill_lock:
+            if not os.path.exists(self.spill_path):
+                return
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                spilled = [json.loads(line) for line in f if line.strip()]
+
+            for i, params in enumerate(spilled):
+                if self._request(params) == 'failed':
+                    tmp_path = self.spill_path + '.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        f.writelines(json.dumps(rest) + '\n' for rest in spilled[i:])
+                    os.replace(tmp_path, self.spill_path)
+                    return
+            os.remove(self.spill_path)
+
+
+# 로컬 스텁 서버로 전송, 재시도, 거부, 디스크 저장 동작을 확인 (python notifier.py)
+# 스텁 서버는 hole 값에 따라 200, 400, 503으로 응답
+if __name__ == '__main__':
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    received = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hole = int(parse_qs(urlparse(self.path).query)['hole'][0])
+            received.append(hole)
+            status = {400: 400, 503: 503}.get(hole, 200)
+            self.send_response(status)
+            self.end_headers()
+            self.wfile.write(b'ok' if status == 200 else b'error')
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/api/notification/save'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spill_path = os.path.join(tmp, 'spill.jsonl')
+        dispatcher = NotificationDispatcher(url, window=0.1, max_retries=2, backoff=0.01, spill_path=spill_path)
+
+        # 거부(400)는 한 번만 보내고 저장하지 않음, 서버 오류(503)는 재시도 후 저장
+        assert dispatcher._send(dispatcher.params({'hole': 1}, 't')) == 'sent'
+        assert dispatcher._send(dispatcher.params({'hole': 400}, 't')) == 'rejected'
+        assert dispatcher._send(dispatcher.params({'hole': 503}, 't')) == 'failed'
+        assert received == [1, 400, 503, 503, 503], received
+
+        # 저장된 알림 중 거부되는 알림은 버리고 뒤의 알림을 계속 보냄
+        for hole in (400, 2, 3):
+            dispatcher._spill(dispatcher.params({'hole': hole}, 't'))
+        dispatcher._resend_spilled()
+        assert received[-3:] == [400, 2, 3], received
+        assert not os.path.exists(spill_path)
+
+        # 서버 오류가 나면 그 알림부터 남겨 둠
+        for hole in (4, 503, 5):
+            dispatcher._spill(dispatcher.params({'hole': hole}, 't'))
+        dispatcher._resend_spilled()
+        with open(spill_path, 'r', encoding='utf-8') as f:
+            assert [json.loads(line)['hole'] for line in f] == [503, 5]
+    server.shutdown()
+    print(f'OK {dispatcher.stats}')
@@ -0,0 +1,167 @@
+import atexit
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+from scheduler import DetectionResult
+
+
+# 전처리된 입력 텐서를 워커 프로세스에 넘기기 위한 공유 메모리 슬롯 묶음
+# 같은 텐서를 여러 모델에 보내면 슬롯 하나를 같이 사용 (한 번만 복사)
+class TensorSlots:
+    def __init__(self, slots, slot_bytes):
+        self.shms = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slots)]
+        self.slot_bytes = slot_bytes
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.refs = [0] * slots
+        self.lock = threading.Lock()
+        self.last_tensor = None
+        self.last_slot = None
+        atexit.register(self.close)
+
+    def names(self):
+        return [shm.name for shm in self.shms]
+
+    def acquire(self, tensor):
+        with self.lock:
+            if self.last_tensor is tensor:
+                self.refs[self.last_slot] += 1
+                return self.last_slot
+
+        if tensor.numel() * 4 > self.slot_bytes:
+            raise ValueError(f'Tensor {tuple(tensor.shape)} does not fit in a shared memory slot')
+
+        slot = self.free.get()  # 빈 슬롯이 생길 때까지 대기
+        view = np.ndarray(tuple(tensor.shape), dtype=np.float32, buffer=self.shms[slot].buf)
+        view[...] = tensor.numpy()
+        with self.lock:
+            self.refs[slot] = 1
+            self.last_tensor = tensor
+            self.last_slot = slot
+        return slot
+
+    def release(self, slot):
+        with self.lock:
+            self.refs[slot] -= 1
+            if self.refs[slot] > 0:
+                return
+            if self.last_slot == slot:
+                self.last_tensor = None
+                self.last_slot = None
+        self.free.put(slot)
+
+    def close(self):
+        for shm in self.shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# 워커 프로세스: 모델을 로드한 뒤 공유 메모리의 텐서를 복사 없이 읽어서 추론하고 박스 정보(N x 6)만 돌려줌
+def model_worker(weights, backend, imgsz, calibration_dir, shm_names, requests, responses):
+    from backends import load_model
+
+    model = load_model(weights, backend, imgsz, calibration_dir)
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+
+        request_id, slot, shape, size, options = request
+        try:
+            batch = torch.from_numpy(np.ndarray(shape, dtype=np.float32, buffer=shms[slot].buf))
+            results = model(batch, imgsz=size, verbose=False, **options)
+            responses.put((request_id, [result.boxes.data.cpu().numpy() for result in results], None))
+        except Exception as e:
+            responses.put((request_id, None, str(e)))
+
+    for shm in shms:
+        shm.close()
+
+
+# 별도 프로세스에서 실행되는 모델 (스케줄러에서는 일반 모델처럼 호출하거나 submit으로 미리 요청)
+class ProcessModel:
+    def __init__(self, weights, backend, imgsz, calibration_dir, slots):
+        # 카메라, 추론 스레드가 시작되기 전에 fork로 워커 프로세스를 만듦
+        ctx = multiprocessing.get_context('fork')
+        self.slots = slots
+        self.requests = ctx.Queue()
+        self.responses = ctx.Queue()
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.error = None  # 워커 프로세스가 종료되면 이후 요청을 바로 실패시킬 오류
+        self.request_ids = itertools.count()
+        self.process = ctx.Process(target=model_worker,
+                                   args=(weights, backend, imgsz, calibration_dir, slots.names(),
+                                         self.requests, self.responses))
+        self.process.daemon = True
+        self.process.start()
+
+        thread = threading.Thread(target=self._receive_loop)
+        thread.daemon = True
+        thread.start()
+
+    # options: conf, iou 등 모델 호출 시 같이 넘길 감지 기준
+    # 워커 프로세스가 종료됐으면 요청을 보내지 않고 바로 RuntimeError를 발생시킴 (아무도 읽지 않는 요청이 쌓이지 않도록)
+    def submit(self, batch, imgsz=640, **options):
+        if self.error is None and not self.process.is_alive():
+            self._fail_pending(self._exit_error())
+        if self.error is not None:
+            raise self.error
+
+        slot = self.slots.acquire(batch)
+        future = Future()
+        shape = tuple(batch.shape)
+        with self.pending_lock:
+            if self.error is not None:
+                self.slots.release(slot)
+                raise self.error
+            request_id = next(self.request_ids)
+            self.pending[request_id] = (future, slot, (shape[2], shape[3]))
+        self.requests.put((request_id, slot, shape, imgsz, options))
+        return future
+
+    def __call__(self, batch, imgsz=640, verbose=False, **options):
+        return self.submit(batch, imgsz, **options).result()
+
+    def _receive_loop(self):
+        while True:
+            try:
+                request_id, records, error = self.responses.get(timeout=5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self._fail_pending(self._exit_error())
+                    return
+                continue
+
+            with self.pending_lock:
+                future, slot, shape = self.pending.pop(request_id)
+            self.slots.release(slot)
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result([DetectionResult(torch.from_numpy(data), shape) for data in records])
+
+    def _exit_error(self):
+        return RuntimeError(f'Model worker exited with code {self.process.exitcode}')
+
+    # 기다리던 요청을 모두 실패시키고, 이후 요청도 submit에서 바로 실패하도록 오류를 남김
+    def _fail_pending(self, error):
+        with self.pending_lock:
+            if self.error is None:
+                self.error = error
+            pending, self.pending = self.pending, {}
+        for future, slot, _ in pending.values():
+            self.slots.release(slot)
+            future.set_exception(error)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from pacing import size_steps
+
+
+def parse_clock(value):
+    hour, minute = value.split(':')
+    hour, minute = int(hour), int(minute)
+    # 24:00은 시간대의 끝으로만 사용 (24:30 같은 값은 허용하지 않음)
+    if not (0 <= hour < 24 and 0 <= minute < 60 or (hour, minute) == (24, 0)):
+        raise ValueError(f'Invalid time {value}')
+    return hour * 60 + minute
+
+
+# 모델별 실행 프로필 (입력 크기, 신뢰도/IoU 기준, 최소 실행 간격(초), 실행 시간대)
+# windows: [["06:00", "19:00"], ...] 현지 시각 기준 실행 시간대 (비어 있으면 항상 실행, 자정을 넘는 구간도 가능)
+# 관리자 API에서 실행 중에 바꿀 수 있고, 바뀔 때마다 version이 올라감
+class ModelProfile:
+    fields = ('imgsz', 'conf', 'iou', 'interval', 'windows')
+
+    def __init__(self, imgsz=640, conf=0.25, iou=0.7, interval=None, windows=None, min_imgsz=320, max_imgsz=640):
+        self.min_imgsz = min_imgsz
+        self.max_imgsz = max_imgsz  # 내보낸 모델과 공유 메모리 슬롯 크기의 기준 (설정 파일의 imgsz)
+        self.values = {}
+        self.minutes = []  # 실행 시간대 (분 단위)
+        self.version = 0
+        self.lock = threading.Lock()
+        self.update({'imgsz': imgsz, 'conf': conf, 'iou': iou, 'interval': interval, 'windows': windows or []})
+
+    # 일부 항목만 바꿀 수 있음 (잘못된 값이면 ValueError, 아무것도 바뀌지 않음)
+    def update(self, changes):
+        unknown = set(changes) - set(self.fields)
+        if unknown:
+            raise ValueError(f'Unknown profile fields: {", ".join(sorted(unknown))}')
+
+        with self.lock:
+            values = dict(self.values, **changes)
+            imgsz = values['imgsz']
+            if not isinstance(imgsz, int) or imgsz % 32 or not 32 <= imgsz <= self.max_imgsz:
+                raise ValueError(f'imgsz must be a multiple of 32 between 32 and {self.max_imgsz}')
+            for name in ('conf', 'iou'):
+                if not isinstance(values[name], (int, float)) or not 0 <= values[name] <= 1:
+                    raise ValueError(f'{name} must be between 0 and 1')
+            if values['interval'] is not None and (not isinstance(values['interval'], (int, float)) or values['interval'] < 0):
+                raise ValueError('interval must be a non-negative number of seconds or null')
+            try:
+                minutes = [(parse_clock(start), parse_clock(end)) for start, end in values['windows']]
+            except (TypeError, ValueError, AttributeError):
+                raise ValueError('windows must be a list of ["HH:MM", "HH:MM"] pairs')
+
+            self.values = values
+            self.minutes = minutes
+            self.version += 1
+
+    def __getattr__(self, name):
+        if name in ModelProfile.fields:
+            return self.values[name]
+        raise AttributeError(name)
+
+    # 현재 시각이 실행 시간대 안인지
+    def active(self, now=None):
+        minutes = self.minutes
+        if not minutes:
+            return True
+        local = time.localtime(time.time() if now is None else now)
+        current = local.tm_hour * 60 + local.tm_min
+        for start, end in minutes:
+            if start <= end:
+                if start <= current < end:
+                    return True
+            elif current >= start or current < end:
+                return True
+        return False
+
+    # 모델 호출 시 넘길 감지 기준
+    def predict_args(self):
+        values = self.values
+        return {'conf': values['conf'], 'iou': values['iou']}
+
+    # PacingController가 사용할 입력 크기 목록 (프로필 크기부터 min_imgsz까지)
+    def sizes(self):
+        return size_steps(self.imgsz, min(self.min_imgsz, self.imgsz))
+
+    def to_dict(self):
+        return dict(self.values, version=self.version, active=self.active())
@@ -0,0 +1,104 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from metrics import jpeg_encode_seconds, jpeg_size_bytes
+
+logger = logging.getLogger('nufarm')
+
+
+# 모델별 최신 프레임과 감지 결과를 보관하고, 요청이 있을 때만 그려서 JPEG로 제공하는 클래스
+# 렌더링한 이미지는 (version, timestamp, jpeg bytes) 튜플로 통째로 교체되므로 읽을 때 lock이 필요 없음
+class ImagePublisher:
+    def __init__(self, render=None, persist_path=None, quality=90):
+        self.render = render  # render(frame, detections) -> 박스를 그린 프레임
+        self.quality = quality
+        self.raw = None  # (version, timestamp, frame, detections)
+        self.snapshot = None  # 마지막으로 렌더링한 이미지
+        self.version = 0
+        self.cond = threading.Condition()  # 새 프레임 발행을 스트리밍 클라이언트에 알림
+        self.render_lock = threading.Lock()  # 같은 프레임을 여러 요청이 동시에 렌더링하지 않도록 함
+
+        # persist_path가 있으면 백그라운드 스레드에서 디스크에 저장 (선택 사항)
+        self.persist_path = persist_path
+        self.persist_queue = queue.Queue(maxsize=1)
+        if persist_path:
+            thread = threading.Thread(target=self._persist_loop)
+            thread.daemon = True
+            thread.start()
+
+    def encode(self, frame):
+        start = time.perf_counter()
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        jpeg_encode_seconds.observe(time.perf_counter() - start)
+        jpeg_size_bytes.observe(buf.size)
+        return buf.tobytes()
+
+    # 원본 프레임과 감지 결과만 저장 (그리기와 인코딩은 이미지 요청이 올 때 수행)
+    # frame은 다른 모델과 공유될 수 있으므로 render에서 복사본에 그려야 함
+    def publish(self, frame, detections=None):
+        with self.cond:
+            self.version += 1
+            self.raw = (self.version, time.time(), frame, detections)
+            self.cond.notify_all()
+
+        if self.persist_path:
+            # 저장이 밀려 있으면 이전 요청은 무시하고 최신 이미지만 저장
+            try:
+                self.persist_queue.put_nowait(True)
+            except queue.Full:
+                pass
+
+    # 최신 프레임의 JPEG 이미지 (프레임 버전별로 한 번만 렌더링)
+    def latest(self):
+        raw = self.raw
+        if raw is None:
+            return None
+
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot[0] >= raw[0]:
+            return snapshot
+
+        with self.render_lock:
+            snapshot = self.snapshot
+            if snapshot is not None and snapshot[0] >= raw[0]:
+                return snapshot
+
+            version, timestamp, frame, detections = raw
+            if self.render is not None:
+                frame = self.render(frame, detections)
+            data = self.encode(frame)
+            if data is None:
+                return snapshot
+
+            self.snapshot = (version, timestamp, data)
+            return self.snapshot
+
+    # last_version보다 새로운 프레임이 발행될 때까지 대기 (시간 초과 시 None)
+    def wait_newer(self, last_version, timeout=None):
+        with self.cond:
+            self.cond.wait_for(lambda: self.version > last_version, timeout)
+            if self.version <= last_version:
+                return None
+        return self.latest()
+
+    def _persist_loop(self):
+        while True:
+            self.persist_queue.get()
+            snapshot = self.latest()
+            if snapshot is None:
+                continue
+
+            tmp_path = self.persist_path + '.tmp'
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(snapshot[2])
+                os.replace(tmp_path, self.persist_path)
+            except OSError as e:
+                logger.error('Saving image failed', extra={'fields': {'path': self.persist_path, 'error': str(e)}})
@@ -0,0 +1,155 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import resource
+import time
+
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from ultralytics import YOLO
+
+from backends import export_model
+from scheduler import letterbox
+
+
+image_patterns = ('*.jpg', '*.jpeg', '*.png')
+
+
+def list_images(folder, limit=None):
+    paths = sorted(p for pattern in image_patterns for p in glob.glob(os.path.join(folder, pattern)))
+    return paths[:limit] if limit else paths
+
+
+# 직접 캡처한 웹캠 이미지 폴더로 INT8 보정(calibration) 데이터를 만드는 reader
+class FrameCalibrationReader(CalibrationDataReader):
+    def __init__(self, paths, input_name, imgsz):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            image, _, _ = letterbox(frame, self.imgsz)
+            x = image[..., ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(x)}
+        return None
+
+
+# 마지막 Detect 헤드는 양자화하면 박스 좌표 정확도가 크게 떨어지므로 FP32로 유지
+def detect_head_nodes(model):
+    indices = [int(m.group(1)) for node in model.graph.node for m in [re.match(r'/model\.(\d+)/', node.name)] if m]
+    if not indices:
+        return []
+    prefix = f'/model.{max(indices)}/'
+    return [node.name for node in model.graph.node if node.name.startswith(prefix)]
+
+
+# ONNX 모델을 INT8로 정적 양자화 (보정 이미지 목록별로 한 번만 수행)
+def quantize_model(weights, calibration_dir, imgsz=640, limit=200):
+    paths = list_images(calibration_dir, limit)
+    if not paths:
+        raise FileNotFoundError(f'No calibration images in {calibration_dir}')
+
+    fp32_path = export_model(weights, 'onnx', imgsz)
+    calib_hash = hashlib.sha256('\n'.join(paths).encode()).hexdigest()[:8]
+    target = fp32_path[:-len('.onnx')] + f'.int8-{calib_hash}.onnx'
+    if os.path.exists(target):
+        return target
+
+    fp32_model = onnx.load(fp32_path)
+    reader = FrameCalibrationReader(paths, fp32_model.graph.input[0].name, imgsz)
+    tmp_path = target + '.tmp'
+    quantize_static(fp32_path, tmp_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    nodes_to_exclude=detect_head_nodes(fp32_model))
+
+    # 클래스 이름, stride 등 ultralytics가 읽는 메타데이터를 FP32 모델에서 복사
+    int8_model = onnx.load(tmp_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+# 한 모델 변형의 지연 시간, 최대 메모리(RSS), mAP를 측정 (별도 프로세스에서 실행)
+def measure(path, images, data, imgsz, results):
+    model = YOLO(path, task='detect')
+    frames = [frame for frame in (cv2.imread(p) for p in images) if frame is not None]
+
+    model(frames[0], imgsz=imgsz, verbose=False)  # 워밍업
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        model(frame, imgsz=imgsz, verbose=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    report = {
+        'model': path,
+        'frames': len(latencies),
+        'latency_ms_mean': float(np.mean(latencies)),
+        'latency_ms_p50': float(np.percentile(latencies, 50)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+        # 검증(model.val)은 데이터로더와 전체 데이터셋을 메모리에 올리므로 추론만 한 시점의 최대 메모리를 기록
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if data:
+        metrics = model.val(data=data, imgsz=imgsz, batch=1, plots=False, verbose=False)
+        report['map50'] = float(metrics.box.map50)
+        report['map50_95'] = float(metrics.box.map)
+    results.put(report)
+
+
+def run_measure(path, images, data, imgsz):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=measure, args=(path, images, data, imgsz, results))
+    process.start()
+    report = results.get()
+    process.join()
+    return report
+
+
+# FP32 / INT8 모델의 정확도와 속도 비교 리포트
+def build_report(weights, calibration_dir, data=None, imgsz=640, frames=100):
+    images = list_images(calibration_dir, frames)
+    fp32 = run_measure(export_model(weights, 'onnx', imgsz), images, data, imgsz)
+    int8 = run_measure(quantize_model(weights, calibration_dir, imgsz), images, data, imgsz)
+
+    report = {'weights': weights, 'data': data, 'imgsz': imgsz, 'fp32': fp32, 'int8': int8,
+              'speedup': fp32['latency_ms_mean'] / int8['latency_ms_mean']}
+    if data:
+        report['map50_95_drop'] = fp32['map50_95'] - int8['map50_95']
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='YOLO 모델 INT8 양자화 및 FP32/INT8 비교 리포트')
+    parser.add_argument('weights', nargs='+', help='양자화할 가중치 파일 (.pt)')
+    parser.add_argument('--calib', default='./calibration', help='보정에 사용할 웹캠 캡처 이미지 폴더')
+    parser.add_argument('--data', default=None, help='mAP 측정용 데이터셋 yaml (예: ../성장관리/모델/yaml/model_2.yaml)')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--frames', type=int, default=100, help='지연 시간 측정에 사용할 이미지 수')
+    parser.add_argument('--report', default='quantize_report.json', help='리포트 저장 경로')
+    args = parser.parse_args()
+
+    reports = [build_report(w, args.calib, args.data, args.imgsz, args.frames) for w in args.weights]
+    for r in reports:
+        print(f"{r['weights']}: FP32 {r['fp32']['latency_ms_mean']:.1f} ms / {r['fp32']['peak_rss_mb']:.0f} MB, "
+              f"INT8 {r['int8']['latency_ms_mean']:.1f} ms / {r['int8']['peak_rss_mb']:.0f} MB, "
+              f"x{r['speedup']:.2f}")
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(reports, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import torch
+
+from scheduler import DetectionResult
+
+
+# 카메라별 관심 영역 (재배대 등) 마스크
+# regions: 사각형 [x1, y1, x2, y2] 또는 다각형 [[x, y], ...] 목록 (픽셀 좌표)
+# 관심 영역을 모두 포함하는 사각형만 잘라서 모델에 넣고, 그 안에서도 영역 밖은 회색으로 채움
+class RegionMask:
+    def __init__(self, regions):
+        self.polygons = []
+        for region in regions:
+            if len(region) == 4 and np.isscalar(region[0]):
+                x1, y1, x2, y2 = region
+                region = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            self.polygons.append(np.array(region, dtype=np.int32))
+        self.layouts = {}  # 프레임 크기별 (마스크, 자를 영역, 잘린 영역에서 관심 영역 밖인 부분)
+
+    def layout(self, shape):
+        if shape not in self.layouts:
+            mask = np.zeros(shape, dtype=np.uint8)
+            cv2.fillPoly(mask, self.polygons, 255)
+            x, y, w, h = cv2.boundingRect(mask)
+            if w == 0 or h == 0:
+                raise ValueError(f'Region of interest is outside the {shape[1]}x{shape[0]} frame')
+            outside = mask[y:y + h, x:x + w] == 0
+            self.layouts[shape] = (mask > 0, (x, y, w, h), outside[..., None] if outside.any() else None)
+        return self.layouts[shape]
+
+    # 모델에 넣을 관심 영역 이미지 (원본 프레임은 수정하지 않음)
+    def crop(self, frame):
+        _, (x, y, w, h), outside = self.layout(frame.shape[:2])
+        cropped = frame[y:y + h, x:x + w]
+        if outside is not None:
+            cropped = cropped.copy()
+            np.copyto(cropped, np.uint8(114), where=outside)
+        return cropped
+
+    # 잘린 이미지 좌표의 박스를 프레임 좌표로 옮기고, 중심이 관심 영역 밖인 박스는 제거
+    def restore(self, result, shape):
+        mask, (x, y, _, _), _ = self.layout(shape)
+        data = result.boxes.data.clone()
+        data[:, [0, 2]] += x
+        data[:, [1, 3]] += y
+        if len(data):
+            cx = ((data[:, 0] + data[:, 2]) / 2).long().clamp_(0, shape[1] - 1).numpy()
+            cy = ((data[:, 1] + data[:, 3]) / 2).long().clamp_(0, shape[0] - 1).numpy()
+            data = data[torch.from_numpy(mask[cy, cx])]
+        return DetectionResult(data, shape)
@@ -0,0 +1,318 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+from metrics import frames_inferred, inference_seconds, results_dropped
+from motion import ChangeDetector
+
+logger = logging.getLogger('nufarm')
+
+
+# 프레임을 모델 입력 크기(정사각형)에 맞게 비율을 유지하며 리사이즈하고 남는 부분은 회색으로 채움
+def letterbox(frame, size):
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_w, pad_h = size - new_w, size - new_h
+    left, top = pad_w // 2, pad_h // 2
+    padded = cv2.copyMakeBorder(frame, top, pad_h - top, left, pad_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, ratio, (left, top)
+
+
+# 여러 프레임을 한 번만 전처리해서 모든 모델이 같이 쓰는 BCHW 텐서(RGB, 0~1)로 변환
+def preprocess(frames, size):
+    images, metas = [], []
+    for frame in frames:
+        image, ratio, pad = letterbox(frame, size)
+        images.append(image)
+        metas.append((ratio, pad, frame.shape[:2]))
+
+    batch = np.ascontiguousarray(np.stack(images)[..., ::-1].transpose(0, 3, 1, 2))
+    tensor = torch.from_numpy(batch).float().div_(255.0)
+    return tensor, metas
+
+
+# 텐서 좌표로 나온 박스를 원본 프레임 좌표로 되돌림
+def restore_boxes(result, meta):
+    ratio, (left, top), (h, w) = meta
+    data = result.boxes.data.clone()
+    data[:, [0, 2]] = ((data[:, [0, 2]] - left) / ratio).clamp_(0, w)
+    data[:, [1, 3]] = ((data[:, [1, 3]] - top) / ratio).clamp_(0, h)
+    result.boxes = Boxes(data, (h, w))
+    result.orig_shape = (h, w)
+    return result
+
+
+# 박스 정보(N x 6 텐서)만 가진 감지 결과 (워커 프로세스, 타일 추론 결과를 YOLO 결과처럼 사용)
+class DetectionResult:
+    def __init__(self, data, shape):
+        self.boxes = Boxes(data, shape)
+        self.orig_shape = shape
+
+
+# 캡처된 프레임을 한 번 전처리한 뒤 여러 모델을 연달아 실행하는 스케줄러
+# 프레임이 여러 개(여러 카메라 또는 밀린 프레임) 있으면 모델별로 한 번에 배치 추론
+# 모델별 실행 간격과 입력 크기는 PacingController가 추론 시간을 보고 정함
+class InferenceScheduler:
+    # inference_timeout: 별도 프로세스 모델의 결과를 기다리는 최대 시간 (초)
+    def __init__(self, rings, max_batch=4, rois=None, inference_timeout=30.0):
+        self.rings = rings  # 카메라 ID -> FrameRing
+        self.max_batch = max_batch
+        self.inference_timeout = inference_timeout
+        self.rois = rois or {}  # 카메라 ID -> RegionMask (관심 영역만 모델에 넣음)
+        self.jobs = []
+        self.last_versions = {camera_id: 0 for camera_id in rings}
+
+    # model: YOLO 모델, handler(source, frame, results, unchanged): 결과 후처리 함수 (source는 카메라 ID), pacer: PacingController
+    # change_threshold를 주면 장면 변화가 없을 때 추론을 건너뛰고 이전 결과를 다시 사용 (이때 unchanged가 True)
+    # tiler를 주면 공유 텐서 대신 프레임을 타일로 나눠서 추론 (tiling.Tiler)
+    # detect_every가 N이면 카메라별로 N번에 한 번만 추론하고 나머지는 이전 결과를 다시 전달 (추적기가 위치를 예측)
+    # profile(profiles.ModelProfile)을 주면 입력 크기, 감지 기준, 최소 실행 간격, 실행 시간대를 따름
+    def add_model(self, name, model, handler, pacer, change_threshold=None, max_staleness=60.0, tiler=None,
+                  detect_every=1, profile=None):
+        job = {
+            'name': name,
+            'model': model,
+            'handler': handler,
+            'pacer': pacer,
+            'next_run': 0,
+            'queue': queue.Queue(maxsize=self.max_batch),
+            'change_threshold': change_threshold,
+            'max_staleness': max_staleness,
+            'detectors': {},  # 카메라별 변화 감지기
+            'cache': {},  # 카메라별 마지막 추론 결과
+            'tiler': tiler,
+            'detect_every': detect_every,
+            'rounds': {},  # 카메라별 실행 횟수 (detect_every용)
+            'inferred': 0,  # 모델로 추론한 프레임 수
+            'skipped': 0,  # 변화가 없거나 detect_every 때문에 이전 결과를 다시 사용한 프레임 수
+            'profile': profile,
+            'profile_version': profile.version if profile is not None else None,
+        }
+        self.jobs.append(job)
+
+        # 후처리는 모델별 스레드에서 실행해서 다음 추론을 막지 않도록 함
+        thread = threading.Thread(target=self._dispatch_loop, args=(job,))
+        thread.daemon = True
+        thread.start()
+
+    def start(self):
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def run(self):
+        while True:
+            now = time.time()
+            due = [job for job in self.jobs if self._is_due(job, now)]
+            if not due:
+                # 프로필 변경이 늦게 반영되지 않도록 최대 1초씩만 대기
+                time.sleep(min(1.0, min(job['next_run'] for job in self.jobs) - now))
+                continue
+
+            frames = self._collect_frames(min(job['pacer'].interval() for job in due))
+            if not frames:
+                continue
+
+            for start in range(0, len(frames), self.max_batch):
+                chunk = frames[start:start + self.max_batch]
+                # 관심 영역이 있는 카메라는 그 부분만 잘라서 변화 감지와 추론에 사용
+                inputs = [self.rois[source].crop(frame) if source in self.rois else frame for source, frame in chunk]
+
+                # 모델별로 실제 추론이 필요한 프레임만 고름 (장면 변화가 없으면 건너뜀)
+                reasons = [[self._skip_reason(job, source, inputs[i]) for i, (source, _) in enumerate(chunk)]
+                           for job in due]
+                plans = [[i for i, reason in enumerate(job_reasons) if reason is None] for job_reasons in reasons]
+                for job, plan in zip(due, plans):
+                    job['skipped'] += len(chunk) - len(plan)
+                needed = sorted(set(i for plan in plans for i in plan))
+                positions = {i: k for k, i in enumerate(needed)}
+                tensors = {}  # 입력 크기별 전처리 결과 (같은 크기를 쓰는 모델끼리 공유)
+
+                # 같은 텐서로 실행할 모델들을 연달아 추론
+                pending = []
+                for job, plan in zip(due, plans):
+                    if plan:
+                        size = job['pacer'].imgsz
+                        if job['tiler'] is not None:
+                            # 타일 추론은 프레임별 타일을 따로 잘라서 한 번에 배치 추론
+                            batch, metas = job['tiler'].preprocess([inputs[i] for i in plan], size)
+                        else:
+                            if size not in tensors:
+                                tensors[size] = preprocess([inputs[i] for i in needed], size)
+                            tensor, metas = tensors[size]
+                            batch = tensor if len(plan) == len(needed) else tensor[[positions[i] for i in plan]]
+                        inference_start = time.perf_counter()
+                        try:
+                            if hasattr(job['model'], 'submit'):
+                                # 별도 프로세스의 모델은 요청만 보내 두고 결과는 아래에서 받음 (모델끼리 동시에 실행)
+                                results = job['model'].submit(batch, imgsz=size, **self._predict_args(job))
+                            else:
+                                results = job['model'](batch, imgsz=size, verbose=False, **self._predict_args(job))
+                                self._record_latency(job, time.perf_counter() - inference_start, len(plan))
+                        except Exception as e:
+                            logger.error('Inference failed', extra={'fields': {'model': job['name'], 'error': str(e)}})
+                            continue
+                        pending.append((job, plan, metas, inference_start, results))
+
+                for job, plan, metas, inference_start, results in pending:
+                    if isinstance(results, Future):
+                        try:
+                            results = results.result(timeout=self.inference_timeout)
+                        except Exception as e:
+                            logger.error('Inference failed', extra={'fields': {'model': job['name'], 'error': str(e) or repr(e)}})
+                            continue
+                        self._record_latency(job, time.perf_counter() - inference_start, len(plan))
+                    job['inferred'] += len(plan)
+                    if job['tiler'] is not None:
+                        results = job['tiler'].merge(results, metas, [inputs[i] for i in plan])
+                    else:
+                        results = [restore_boxes(result, metas[positions[i]]) for i, result in zip(plan, results)]
+                    for i, result in zip(plan, results):
+                        source, frame = chunk[i]
+                        if source in self.rois:
+                            result = self.rois[source].restore(result, frame.shape[:2])
+                        job['cache'][source] = [result]
+
+                for job, job_reasons in zip(due, reasons):
+                    for (source, frame), reason in zip(chunk, job_reasons):
+                        if source in job['cache']:
+                            self._dispatch(job, (source, frame, job['cache'][source], reason == 'unchanged'))
+
+            # 다음 실행 시각은 이번 실행을 시작한 시각 기준 (추론 시간만큼 대기 시간이 줄어듦)
+            for job in due:
+                job['next_run'] = now + self._interval(job)
+
+    # 프로필이 바뀌었으면 입력 크기 목록을 다시 정하고 바로 실행, 실행 시간대가 아니면 1분 뒤에 다시 확인
+    def _is_due(self, job, now):
+        profile = job['profile']
+        if profile is not None and profile.version != job['profile_version']:
+            job['profile_version'] = profile.version
+            job['pacer'].set_sizes(profile.sizes())
+            job['next_run'] = min(job['next_run'], now)
+        if job['next_run'] > now:
+            return False
+        if profile is not None and not profile.active(now):
+            job['next_run'] = now + 60
+            return False
+        return True
+
+    def _predict_args(self, job):
+        return job['profile'].predict_args() if job['profile'] is not None else {}
+
+    # 실행 간격: PacingController가 정한 간격과 프로필의 최소 실행 간격 중 긴 쪽
+    def _interval(self, job):
+        interval = job['pacer'].interval()
+        if job['profile'] is not None and job['profile'].interval is not None:
+            interval = max(interval, job['profile'].interval)
+        return interval
+
+    # 추론이 끝난 배치마다 추론 시간과 추론한 프레임 수를 기록
+    def _record_latency(self, job, latency, frames):
+        job['pacer'].record(latency)
+        inference_seconds.observe(latency, model=job['name'])
+        frames_inferred.inc(frames, model=job['name'])
+
+    # 추론을 건너뛰는 이유: None (추론 필요), 'sparse' (detect_every), 'unchanged' (장면 변화 없음)
+    def _skip_reason(self, job, source, frame):
+        if job['detect_every'] > 1 and source in job['cache']:
+            job['rounds'][source] = job['rounds'].get(source, 0) + 1
+            if job['rounds'][source] % job['detect_every']:
+                return 'sparse'
+        if job['change_threshold'] is None:
+            return None
+        if source not in job['detectors']:
+            job['detectors'][source] = ChangeDetector(job['change_threshold'], job['max_staleness'])
+        if job['detectors'][source].should_infer(frame) or source not in job['cache']:
+            return None
+        return 'unchanged'
+
+    # 모델별 추론 횟수, 변화가 없어서 건너뛴 횟수, 현재 실행 속도와 입력 크기
+    def stats(self):
+        stats = {}
+        for job in self.jobs:
+            total = job['inferred'] + job['skipped']
+            stats[job['name']] = {
+                'inferred': job['inferred'],
+                'skipped': job['skipped'],
+                'skip_ratio': job['skipped'] / total if total else 0.0,
+                **job['pacer'].stats(),
+            }
+        return stats
+
+    # 카메라별로 아직 처리하지 않은 프레임을 모음
+    # 새 프레임이 없는 카메라들에는 한 번에 프레임을 요청하고, 어느 카메라든 먼저 들어오면
+    # 최근 stale초 안에 프레임을 보낸 카메라만 grace초 더 기다린 뒤 진행 (응답이 없는 카메라가 다른 카메라 처리를 막지 않음)
+    def _collect_frames(self, max_age, grace=0.05, stale=5.0):
+        per_source = max(1, self.max_batch // len(self.rings))
+        frames = []
+        waiting = []
+        for source, ring in self.rings.items():
+            slots = ring.get_since(self.last_versions[source], per_source)
+            if not slots or time.time() - slots[-1][1] > max_age:
+                waiting.append(source)
+            else:
+                self._take(frames, source, slots)
+        if not waiting:
+            return frames
+
+        event = threading.Event()
+        for source in waiting:
+            self.rings[source].request(event)
+        try:
+            if not frames and event.wait(max(max_age, 1.0)):
+                now = time.time()
+                alive = [source for source in waiting
+                         if now - (self.rings[source].last_time() or 0) <= stale]
+                deadline = now + grace
+                while len(alive) > 1 and time.time() < deadline:
+                    event.clear()
+                    if all(self.rings[source].version > self.last_versions[source] for source in alive):
+                        break
+                    event.wait(deadline - time.time())
+            for source in waiting:
+                latest = self.rings[source].get_latest(self.last_versions[source], max_age=max_age, timeout=0)
+                if latest is not None:
+                    self._take(frames, source, [latest])
+        finally:
+            for source in waiting:
+                self.rings[source].release(event)
+        return frames
+
+    def _take(self, frames, source, slots):
+        for version, _, frame in slots:
+            frames.append((source, frame))
+            self.last_versions[source] = version
+
+    # 후처리가 밀리면 가장 오래된 결과를 버리고 최신 결과를 넣음
+    def _dispatch(self, job, item):
+        while True:
+            try:
+                job['queue'].put_nowait(item)
+                return
+            except queue.Full:
+                results_dropped.inc(model=job['name'])
+                try:
+                    job['queue'].get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _dispatch_loop(self, job):
+        while True:
+            source, frame, results, unchanged = job['queue'].get()
+            try:
+                job['handler'](source, frame, results, unchanged)
+            except Exception as e:
+                logger.error('Post-processing failed', extra={'fields': {'model': job['name'], 'error': str(e)}})
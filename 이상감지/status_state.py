@@ -0,0 +1,38 @@
+import threading
+import time
+
+from metrics import TimedLock
+
+
+# 이상 감지 상태(status)를 관리하는 클래스
+# reset 버튼을 누르면 클래스별로 정해진 시간(deadline)까지 해당 클래스 감지를 무시하고 status를 False로 유지
+# 추론, 개수 집계, 이미지는 그 동안에도 계속 갱신됨
+class StatusState:
+    def __init__(self, suppress_seconds):
+        self.suppress_seconds = suppress_seconds  # {'hole': 100, 'wither': 100}
+        self.suppressed_until = {}  # 클래스별 상태 고정 해제 시각
+        self.status = False
+        self.lock = threading.Lock()
+
+    # 버튼 클릭 시 status를 False로 바꾸고 클래스별로 일정 시간 동안 고정
+    def suppress(self, now=None):
+        now = time.time() if now is None else now
+        with TimedLock(self.lock, 'status'):
+            self.status = False
+            for name, seconds in self.suppress_seconds.items():
+                self.suppressed_until[name] = now + seconds
+            return self.status
+
+    # 감지 결과로 상태 갱신 (고정 시간이 지나지 않은 클래스는 무시)
+    def update(self, detected_counts, now=None):
+        now = time.time() if now is None else now
+        with TimedLock(self.lock, 'status'):
+            self.status = any(count > 0 and now >= self.suppressed_until.get(name, 0)
+                              for name, count in detected_counts.items())
+            return self.status
+
+    # 클래스별 남은 고정 시간 (초)
+    def remaining(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            return {name: round(until - now, 1) for name, until in self.suppressed_until.items() if until > now}
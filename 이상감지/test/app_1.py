@@ -49,10 +49,10 @@ def capture_image_periodically():
 
             # 객체 감지된 결과를 이미지에 표시
             for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    label_id = int(box.cls)
+                # 박스 정보는 프레임당 한 번에 NumPy로 가져옴
+                xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+                label_ids = result.boxes.cls.cpu().numpy().astype(int)
+                for (x1, y1, x2, y2), label_id in zip(xyxy.tolist(), label_ids.tolist()):
 
                     # 클래스에 따른 색깔 지정
                     if label_id == 0:  # Level_1
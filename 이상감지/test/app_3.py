@@ -1,5 +1,6 @@
 from flask import Flask, jsonify, render_template, Response
 import cv2
+import numpy as np
 import threading
 import os
 import time
@@ -47,15 +48,16 @@ def capture_image_periodically():
 
             # 객체 감지된 결과를 이미지에 표시
             for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)  # 바운딩 박스 좌표
-                    label_id = int(box.cls)  # 클래스 레이블 (int로 변환)
-                    
-                    # 클래스별 박스 개수 카운트 증가
-                    if label_id in class_counts:
-                        class_counts[label_id] += 1
+                # 박스 정보는 프레임당 한 번에 NumPy로 가져옴
+                xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+                label_ids = result.boxes.cls.cpu().numpy().astype(int)
 
+                # 클래스별 개수는 bincount로 한 번에 집계
+                counts = np.bincount(label_ids, minlength=len(class_counts))
+                for label_id in class_counts:
+                    class_counts[label_id] += int(counts[label_id])
+
+                for (x1, y1, x2, y2), label_id in zip(xyxy.tolist(), label_ids.tolist()):
                     # 클래스 이름을 가져옴 (클래스 레이블에 해당하는 이름)
                     label = class_names.get(label_id, 'Unknown')
 
@@ -1,5 +1,6 @@
 from flask import Flask, jsonify, render_template, Response
 import cv2
+import numpy as np
 import threading
 import os
 import time
@@ -58,16 +59,18 @@ def capture_image_periodically():
 
             # 감지된 객체에 대한 클래스별 바운딩 박스 개수를 집계 및 바운딩 박스 그리기
             for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    label_id = int(box.cls)  # 클래스 레이블 (int로 변환)
-                    if label_id in class_counts:
-                        class_counts[label_id] += 1
-                        new_detected = True
-
-                    # 바운딩 박스 정보
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])  # 좌상단 (x1, y1), 우하단 (x2, y2)
-                    confidence = box.conf[0]  # 신뢰도 점수
+                # 박스 정보는 프레임당 한 번에 NumPy로 가져옴
+                xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+                label_ids = result.boxes.cls.cpu().numpy().astype(int)
+
+                # 클래스별 개수는 bincount로 한 번에 집계
+                counts = np.bincount(label_ids, minlength=len(class_counts))
+                for label_id in class_counts:
+                    class_counts[label_id] += int(counts[label_id])
+                if counts[:len(class_counts)].any():
+                    new_detected = True
+
+                for (x1, y1, x2, y2), label_id in zip(xyxy.tolist(), label_ids.tolist()):
                     label = class_names.get(label_id, 'Unknown')
 
                     # 바운딩 박스 그리기
@@ -1,5 +1,6 @@
 from flask import Flask, jsonify, render_template, Response, request
 import cv2
+import numpy as np
 import threading
 import os
 import time
@@ -80,17 +81,18 @@ def capture_image_periodically(model, img_path, class_names, class_colors):
 
             # 감지된 객체 처리
             for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    label_id = int(box.cls)
-                    color = class_colors.get(label_id, (255, 255, 255))
-                    label = class_names.get(label_id, 'Unknown')
+                # 박스 정보는 프레임당 한 번에 NumPy로 가져옴
+                xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+                label_ids = result.boxes.cls.cpu().numpy().astype(int)
 
-                    # 감지된 클래스별 개수 증가
-                    if label in detected_counts:
-                        detected_counts[label] += 1
+                # 감지된 클래스별 개수는 bincount로 한 번에 집계
+                counts = np.bincount(label_ids, minlength=max(class_names) + 1)
+                for label_id, name in class_names.items():
+                    detected_counts[name] += int(counts[label_id])
 
+                for (x1, y1, x2, y2), label_id in zip(xyxy.tolist(), label_ids.tolist()):
+                    color = class_colors.get(label_id, (255, 255, 255))
+                    label = class_names.get(label_id, 'Unknown')
                     cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
                     cv2.putText(frame, f'{label}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
 
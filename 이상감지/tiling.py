@@ -0,0 +1,64 @@
+import numpy as np
+import torch
+from torchvision.ops import batched_nms
+
+from scheduler import DetectionResult, letterbox
+
+
+# 작은 구멍을 놓치지 않도록 프레임(또는 관심 영역)을 겹치는 타일로 나눠서 추론하는 클래스
+# 모든 프레임의 타일을 한 번의 배치로 추론하고, 타일 경계에서 중복된 박스는 NMS로 합침
+# grid: (가로 타일 수, 세로 타일 수), overlap: 이웃한 타일이 겹치는 비율, roi: 타일로 나눌 영역 (x1, y1, x2, y2, 픽셀)
+class Tiler:
+    def __init__(self, grid=(2, 2), overlap=0.2, roi=None, iou=0.5):
+        self.grid = tuple(grid)
+        self.overlap = overlap
+        self.roi = roi
+        self.iou = iou
+        self.layouts = {}  # 프레임 크기별 타일 좌표
+
+    # 한 축을 count개의 겹치는 구간으로 나눔
+    def _spans(self, start, end, count):
+        length = (end - start) / (count - (count - 1) * self.overlap)
+        step = length * (1 - self.overlap)
+        return [(round(start + i * step), round(min(end, start + i * step + length))) for i in range(count)]
+
+    def tiles(self, shape):
+        if shape not in self.layouts:
+            h, w = shape
+            x1, y1, x2, y2 = self.roi if self.roi is not None else (0, 0, w, h)
+            x1, x2 = max(0, x1), min(w, x2)
+            y1, y2 = max(0, y1), min(h, y2)
+            self.layouts[shape] = [(tx1, ty1, tx2, ty2)
+                                   for ty1, ty2 in self._spans(y1, y2, self.grid[1])
+                                   for tx1, tx2 in self._spans(x1, x2, self.grid[0])]
+        return self.layouts[shape]
+
+    # 프레임마다 타일을 잘라서 입력 크기로 맞춘 뒤 하나의 BCHW 텐서로 합침
+    def preprocess(self, frames, size):
+        images, metas = [], []
+        for index, frame in enumerate(frames):
+            for x1, y1, x2, y2 in self.tiles(frame.shape[:2]):
+                image, ratio, pad = letterbox(frame[y1:y2, x1:x2], size)
+                images.append(image)
+                metas.append((index, ratio, pad, (x1, y1, x2, y2)))
+
+        batch = np.ascontiguousarray(np.stack(images)[..., ::-1].transpose(0, 3, 1, 2))
+        return torch.from_numpy(batch).float().div_(255.0), metas
+
+    # 타일별 결과를 프레임 좌표로 옮기고 프레임마다 클래스별 NMS로 중복 박스 제거
+    def merge(self, results, metas, frames):
+        per_frame = [[] for _ in frames]
+        for result, (index, ratio, (left, top), (x1, y1, x2, y2)) in zip(results, metas):
+            data = result.boxes.data.clone()
+            data[:, [0, 2]] = ((data[:, [0, 2]] - left) / ratio).clamp_(0, x2 - x1) + x1
+            data[:, [1, 3]] = ((data[:, [1, 3]] - top) / ratio).clamp_(0, y2 - y1) + y1
+            per_frame[index].append(data)
+
+        merged = []
+        for frame, tiles in zip(frames, per_frame):
+            data = torch.cat(tiles) if tiles else torch.zeros((0, 6))
+            if len(data):
+                keep = batched_nms(data[:, :4], data[:, 4], data[:, 5].long(), self.iou)
+                data = data[keep]
+            merged.append(DetectionResult(data, frame.shape[:2]))
+        return merged
@@ -0,0 +1,178 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from postprocess import Detections, empty_detections
+
+# 칼만 필터 잡음 크기 (박스 크기에 대한 비율, ByteTrack과 같은 방식)
+std_position = 1 / 20
+std_velocity = 1 / 160
+
+
+def to_cxcywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=float)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = np.asarray(boxes_a, dtype=float)[:, None]
+    b = np.asarray(boxes_b, dtype=float)[None]
+    w = (np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])).clip(0)
+    h = (np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])).clip(0)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+# 박스 하나를 따라가는 트랙 (상태: 중심 x, y, 너비, 높이와 각각의 초당 변화량)
+# 추론하지 않은 프레임에서도 경과 시간만큼 위치를 예측
+class Track:
+    def __init__(self, track_id, box, cls, conf, now):
+        self.track_id = track_id
+        self.cls = cls
+        self.conf = conf
+        cx, cy, w, h = to_cxcywh(box)
+        self.x = np.array([cx, cy, w, h, 0, 0, 0, 0], dtype=float)
+        std = [2 * std_position * w, 2 * std_position * h, 2 * std_position * w, 2 * std_position * h,
+               10 * std_velocity * w, 10 * std_velocity * h, 10 * std_velocity * w, 10 * std_velocity * h]
+        self.P = np.diag(np.square(std))
+        self.updated_at = now  # 마지막으로 예측/갱신한 시각
+        self.seen_at = now  # 마지막으로 감지된 시각
+        self.hits = 1
+        self.confirmed = False
+
+    def predict(self, now):
+        dt = now - self.updated_at
+        if dt <= 0:
+            return
+        F = np.eye(8)
+        F[:4, 4:] = dt * np.eye(4)
+        w, h = self.x[2], self.x[3]
+        q = np.square([std_position * w, std_position * h, std_position * w, std_position * h,
+                       std_velocity * w, std_velocity * h, std_velocity * w, std_velocity * h]) * dt
+        self.x = F @ self.x
+        self.x[2:4] = np.maximum(self.x[2:4], 1)
+        self.P = F @ self.P @ F.T + np.diag(q)
+        self.updated_at = now
+
+    def update(self, box, conf, now):
+        z = to_cxcywh(box)
+        w, h = self.x[2], self.x[3]
+        R = np.diag(np.square([std_position * w, std_position * h, std_position * w, std_position * h]))
+        H = np.eye(4, 8)
+        S = H @ self.P @ H.T + R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - H @ self.x)
+        self.P = (np.eye(8) - K @ H) @ self.P
+        self.conf = conf
+        self.seen_at = now
+        self.hits += 1
+
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+
+
+# ByteTrack 방식의 다중 객체 추적기 (카메라마다 하나)
+# 신뢰도가 높은 박스를 먼저 기존 트랙에 연결하고, 남은 트랙은 신뢰도가 낮은 박스로 한 번 더 연결
+# min_hits번 이상 감지된 트랙만 확정하고, 확정될 때 클래스별 고유 개수를 늘림
+# max_age초 동안 감지되지 않은 트랙은 삭제
+class Tracker:
+    def __init__(self, iou_threshold=0.3, high_conf=0.5, min_hits=2, max_age=5.0):
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.tracks = []
+        self.ids = {}  # 클래스별 트랙 ID 카운터 (ID는 클래스마다 1부터)
+        self.unique = {}  # 클래스별 지금까지 확정된 트랙 수
+        self.last_observed = None  # 마지막으로 감지 결과를 반영한 시각
+        self.lock = threading.Lock()
+
+    # detections가 None이면 (추론하지 않은 프레임) 위치만 예측
+    # unchanged가 True면 장면이 바뀌지 않아서 추론을 건너뛴 프레임: 마지막 감지에서 연결된 트랙이 계속 보이는 것으로 처리
+    # (감지 횟수는 늘리지 않으므로 확정에는 실제 추론이 min_hits번 필요하지만, 추론 간격이 max_age보다 길어도 트랙이 유지됨)
+    # 반환값: 이번에 새로 확정된 트랙 목록
+    def update(self, detections=None, now=None, unchanged=False):
+        now = time.time() if now is None else now
+        with self.lock:
+            for track in self.tracks:
+                track.predict(now)
+
+            if unchanged:
+                for track in self.tracks:
+                    if track.seen_at == self.last_observed:
+                        track.seen_at = now
+                self.last_observed = now
+            elif detections is not None:
+                self.last_observed = now
+
+            if detections is not None and len(detections.cls):
+                boxes = detections.xyxy.tolist()
+                high = [i for i, conf in enumerate(detections.conf) if conf >= self.high_conf]
+                low = [i for i, conf in enumerate(detections.conf) if conf < self.high_conf]
+
+                unmatched_tracks, unmatched_high = self._associate(self.tracks, high, detections, boxes, now)
+                self._associate(unmatched_tracks, low, detections, boxes, now)
+
+                for i in unmatched_high:
+                    cls = int(detections.cls[i])
+                    counter = self.ids.setdefault(cls, itertools.count(1))
+                    self.tracks.append(Track(next(counter), boxes[i], cls, float(detections.conf[i]), now))
+
+            self.tracks = [track for track in self.tracks if now - track.seen_at <= self.max_age]
+
+            confirmed = []
+            for track in self.tracks:
+                if not track.confirmed and track.hits >= self.min_hits:
+                    track.confirmed = True
+                    self.unique[track.cls] = self.unique.get(track.cls, 0) + 1
+                    confirmed.append(track)
+            return confirmed
+
+    # 같은 클래스끼리 IoU가 큰 쌍부터 트랙과 박스를 연결
+    def _associate(self, tracks, indices, detections, boxes, now):
+        if not tracks or not indices:
+            return list(tracks), list(indices)
+
+        iou = iou_matrix([track.box() for track in tracks], [boxes[i] for i in indices])
+        same_class = np.array([track.cls for track in tracks])[:, None] == detections.cls[indices][None]
+        iou = np.where(same_class, iou, 0)
+
+        matched_tracks, matched_detections = set(), set()
+        for flat in np.argsort(-iou, axis=None):
+            r, c = divmod(int(flat), iou.shape[1])
+            if iou[r, c] < self.iou_threshold:
+                break
+            if r in matched_tracks or c in matched_detections:
+                continue
+            i = indices[c]
+            tracks[r].update(boxes[i], float(detections.conf[i]), now)
+            matched_tracks.add(r)
+            matched_detections.add(c)
+
+        return ([track for r, track in enumerate(tracks) if r not in matched_tracks],
+                [i for c, i in enumerate(indices) if c not in matched_detections])
+
+    # 확정된 트랙의 현재(예측) 박스
+    def detections(self):
+        with self.lock:
+            tracks = [track for track in self.tracks if track.confirmed]
+            if not tracks:
+                return empty_detections()
+            return Detections(np.array([track.box() for track in tracks]).astype(int).reshape(-1, 4),
+                              np.array([track.cls for track in tracks], dtype=int),
+                              np.array([track.conf for track in tracks], dtype=np.float32))
+
+    # 현재 확정된 트랙 ID와 클래스별 고유 개수
+    def state(self, class_names):
+        with self.lock:
+            active = {name: sorted(track.track_id for track in self.tracks if track.confirmed and track.cls == label_id)
+                      for label_id, name in class_names.items()}
+            unique = {name: self.unique.get(label_id, 0) for label_id, name in class_names.items()}
+        return {'active': active, 'unique': unique}